@@ -0,0 +1,73 @@
+NO_ROOM = float("-inf")
+
+
+def free_room(preprocessor):
+    # Largest load the first-fit allocator still accepts: room in the last virtual thread or on the device
+    device_room = preprocessor.device_capacity - preprocessor.current_load
+    last_thread = preprocessor.last_thread()
+    if last_thread is not None:
+        return max(device_room, preprocessor.virtual_capacity - last_thread.load)
+    return device_room
+
+
+class AllocationIndex:
+    # Max segment tree over each preprocessor's free room, kept in fleet order.
+    # The leftmost leaf with enough room is exactly what the linear first-fit scan would pick.
+    def __init__(self, preprocessors):
+        self.preprocessors = preprocessors
+        self.size = 1
+        while self.size < len(preprocessors):
+            self.size *= 2
+        self.tree = []
+        self.rebuild()
+
+    def rebuild(self):
+        self.tree = [NO_ROOM] * (2 * self.size)
+        for position, preprocessor in enumerate(self.preprocessors):
+            preprocessor.allocation_index = self
+            preprocessor.index_position = position
+            self.tree[self.size + position] = free_room(preprocessor)
+        for node in range(self.size - 1, 0, -1):
+            self.tree[node] = max(self.tree[2 * node], self.tree[2 * node + 1])
+
+    def track(self, preprocessor):
+        # Call after the preprocessor has been appended to the fleet list
+        if len(self.preprocessors) > self.size:
+            self.size *= 2
+            self.rebuild()
+            return
+        preprocessor.allocation_index = self
+        preprocessor.index_position = len(self.preprocessors) - 1
+        self.update(preprocessor)
+
+    def update(self, preprocessor):
+        node = self.size + preprocessor.index_position
+        self.tree[node] = free_room(preprocessor)
+        node //= 2
+        while node:
+            room = max(self.tree[2 * node], self.tree[2 * node + 1])
+            if self.tree[node] == room:
+                break  # Nothing above this node changes either
+            self.tree[node] = room
+            node //= 2
+
+    def first_fit(self, load):
+        if self.tree[1] < load:
+            return None
+        node = 1
+        while node < self.size:
+            node *= 2
+            if self.tree[node] < load:
+                node += 1
+        return self.preprocessors[node - self.size]
+
+    def largest_room(self):
+        # Leftmost preprocessor with the most free room, for worst-fit placement
+        if not self.preprocessors:
+            return None
+        node = 1
+        while node < self.size:
+            node *= 2
+            if self.tree[node] < self.tree[node // 2]:
+                node += 1
+        return self.preprocessors[node - self.size]
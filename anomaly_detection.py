@@ -0,0 +1,117 @@
+import math
+from collections import deque
+
+
+class MisraGries:
+    # Heavy-hitter summary in at most `capacity` counters. A key seen more than total / (capacity + 1) times is
+    # always in the table, and its count is underestimated by at most that much. Updates are amortized O(1): a
+    # full table is decremented as a whole, which removes at least as much count as the update adds.
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counters = {}
+        self.total = 0.0
+
+    def update(self, key):
+        self.total += 1
+        counters = self.counters
+        if key in counters:
+            counters[key] += 1
+        elif len(counters) < self.capacity:
+            counters[key] = 1
+        else:
+            for other in list(counters):
+                counters[other] -= 1
+                if counters[other] <= 0:
+                    del counters[other]
+
+    def decay(self, factor):
+        # Scales every count, so old traffic fades out of the summary
+        self.total *= factor
+        self.counters = {key: count * factor for key, count in self.counters.items() if count * factor >= 0.5}
+
+    def estimate(self, key):
+        return self.counters.get(key, 0)
+
+    def top(self, count):
+        return sorted(self.counters.items(), key=lambda item: item[1], reverse=True)[:count]
+
+
+class AnomalyDetector:
+    # Streaming volume anomaly detection on the simulation clock, O(1) per packet.
+    # Packets are counted per `interval`. The baseline is the mean and standard deviation of the last `window`
+    # intervals that closed while traffic was normal, so an attack does not teach the baseline that it is normal.
+    # An anomaly is raised as soon as the running interval's count passes mean + sigmas * deviation (the deviation
+    # is floored at the Poisson sqrt(mean)), and cleared once an EWMA of the interval counts falls back below it.
+    # While an anomaly is on, only packets from heavy sources or to heavy destinations (at least heavy_share of the
+    # recent traffic, per Misra-Gries summaries of top_k counters) are suspect; the rest stay unprocessed.
+    def __init__(self, clock, interval=1.0, window=10, sigmas=4.0, alpha=0.5, min_rate=0, top_k=64,
+                 heavy_share=0.01, decay=0.5):
+        self.clock = clock
+        self.interval = interval
+        self.sigmas = sigmas
+        self.alpha = alpha
+        self.min_count = min_rate * interval  # The pseudo code's anomaly_threshold, as a floor under the baseline
+        self.heavy_share = heavy_share
+        self.decay = decay
+        self.sources = MisraGries(top_k)
+        self.destinations = MisraGries(top_k)
+
+        self.baseline = deque(maxlen=window)  # Counts of recent normal intervals
+        self.baseline_sum = 0
+        self.baseline_squares = 0
+        self.level = None  # EWMA of interval counts
+        self.interval_index = None
+        self.interval_count = 0
+        self.threshold = math.inf  # No anomalies until the baseline window is full
+        self.anomalous = False
+        self.raised_at = []  # Simulated times anomalies were raised and cleared
+        self.cleared_at = []
+
+    def observe(self, source, destination=None):
+        index = int(self.clock.now // self.interval)
+        if index != self.interval_index:
+            self.start_interval(index)
+        self.interval_count += 1
+        self.sources.update(source)
+        if destination is not None:
+            self.destinations.update(destination)
+        if not self.anomalous and self.interval_count > self.threshold:
+            self.anomalous = True
+            self.raised_at.append(self.clock.now)
+
+    def start_interval(self, index):
+        if self.interval_index is not None:
+            self.close_interval(self.interval_count)
+            for _ in range(min(index - self.interval_index - 1, self.baseline.maxlen)):
+                self.close_interval(0)  # Intervals without traffic
+        self.interval_index = index
+        self.interval_count = 0
+
+    def close_interval(self, count):
+        self.level = count if self.level is None else self.alpha * count + (1 - self.alpha) * self.level
+        self.sources.decay(self.decay)
+        self.destinations.decay(self.decay)
+        if self.anomalous:
+            if self.level > self.threshold:
+                return
+            self.anomalous = False
+            self.cleared_at.append(self.clock.now)
+        if len(self.baseline) == self.baseline.maxlen:
+            oldest = self.baseline[0]
+            self.baseline_sum -= oldest
+            self.baseline_squares -= oldest * oldest
+        self.baseline.append(count)
+        self.baseline_sum += count
+        self.baseline_squares += count * count
+        if len(self.baseline) == self.baseline.maxlen:
+            mean = self.baseline_sum / len(self.baseline)
+            deviation = math.sqrt(max(self.baseline_squares / len(self.baseline) - mean * mean, mean))
+            self.threshold = max(mean + self.sigmas * deviation, self.min_count)
+
+    def is_suspect(self, source, destination=None):
+        if not self.anomalous:
+            return False
+        if self.sources.estimate(source) >= self.heavy_share * self.sources.total:
+            return True
+        return destination is not None and \
+            self.destinations.estimate(destination) >= self.heavy_share * self.destinations.total
@@ -0,0 +1,111 @@
+from event_log import DISABLED_EVENT_LOG, INFO
+
+
+class Autoscaler:
+    # Releases preprocessors that have been drained for at least `cooldown` simulated seconds and parks them in
+    # a warm pool that the allocator draws from before starting new ones. Two guards keep the fleet from flapping:
+    # nothing is released within `cooldown` of the last scale-out, and releases stop once the remaining fleet
+    # would run above `scale_in_utilization` percent. A cooldown of None disables scale-in.
+    def __init__(self, clock, preprocessors, new_preprocessor, metrics, allocation_index=None, cooldown=None,
+                 scale_in_utilization=50, warm_pool_size=0, min_preprocessors=1, event_log=DISABLED_EVENT_LOG):
+        if min_preprocessors < 1:
+            raise ValueError("min_preprocessors must be at least 1")  # The allocator and placement need a fleet
+        self.clock = clock
+        self.preprocessors = preprocessors
+        self.new_preprocessor = new_preprocessor  # Called with a preprocessor ID to start a new instance
+        self.metrics = metrics
+        self.allocation_index = allocation_index
+        self.cooldown = cooldown
+        self.scale_in_utilization = scale_in_utilization
+        self.warm_pool_size = warm_pool_size
+        self.min_preprocessors = min_preprocessors
+        self.event_log = event_log
+
+        self.warm_pool = []
+        self.terminated = []  # Released instances that did not fit in the warm pool
+        self.drained = {}  # Empty preprocessors in the fleet, mapped to when they drained
+        self.started_preprocessors = len(preprocessors)
+        self.last_scale_out = float("-inf")
+
+        # Billing: integrals of the active fleet size and of the warm pool size over simulated time
+        self.preprocessor_seconds = 0.0
+        self.warm_preprocessor_seconds = 0.0
+        self.last_accounted = clock.now
+        for preprocessor in preprocessors:
+            preprocessor.autoscaler = self
+
+    def account(self):
+        elapsed = self.clock.now - self.last_accounted
+        self.preprocessor_seconds += len(self.preprocessors) * elapsed
+        self.warm_preprocessor_seconds += len(self.warm_pool) * elapsed
+        self.last_accounted = self.clock.now
+
+    def preprocessor_drained(self, preprocessor):
+        self.drained[preprocessor] = self.clock.now
+
+    def preprocessor_busy(self, preprocessor):
+        self.drained.pop(preprocessor, None)
+
+    def provision(self):
+        # Called by the allocator when nothing in the fleet fits; the caller appends the result to the fleet
+        self.account()
+        self.last_scale_out = self.clock.now
+        if self.warm_pool:
+            preprocessor = self.warm_pool.pop()
+            self.metrics.resume(preprocessor)
+            if self.event_log.info:
+                self.event_log.emit(INFO, "preprocessor-reused", self.clock.now,
+                                    preprocessor=preprocessor.preprocessor_id)
+            return preprocessor
+        self.started_preprocessors += 1
+        preprocessor = self.new_preprocessor(self.started_preprocessors)
+        preprocessor.autoscaler = self
+        return preprocessor
+
+    def scale_in(self):
+        self.account()
+        if self.cooldown is None or self.clock.now - self.last_scale_out < self.cooldown:
+            return []
+
+        released = []
+        fleet_size = len(self.preprocessors)
+        for preprocessor, drained_at in self.drained.items():
+            if fleet_size <= self.min_preprocessors:
+                break
+            if self.clock.now - drained_at < self.cooldown:
+                break  # Later entries drained even more recently
+            # Drained preprocessors carry no load, so the fleet's load is unchanged by the release
+            remaining_capacity = (fleet_size - 1) * preprocessor.device_capacity
+            if self.metrics.total_load / remaining_capacity * 100 > self.scale_in_utilization:
+                break
+            released.append(preprocessor)
+            fleet_size -= 1
+        if not released:
+            return released
+
+        released_set = set(released)
+        self.preprocessors[:] = [p for p in self.preprocessors if p not in released_set]
+        for preprocessor in released:
+            del self.drained[preprocessor]
+            self.metrics.release(preprocessor)
+            preprocessor.allocation_index = None
+            warm = len(self.warm_pool) < self.warm_pool_size
+            if warm:
+                self.warm_pool.append(preprocessor)
+            else:
+                self.terminated.append(preprocessor)
+            if self.event_log.info:
+                self.event_log.emit(INFO, "preprocessor-released", self.clock.now,
+                                    preprocessor=preprocessor.preprocessor_id, warm=warm)
+        if self.allocation_index is not None:
+            # Fleet positions shifted, so the index is rebuilt once per scale-in rather than per release
+            self.allocation_index.rebuild()
+        return released
+
+    def report(self):
+        self.account()
+        return {
+            "warm_preprocessors": len(self.warm_pool),
+            "preprocessor_seconds": self.preprocessor_seconds,
+            "warm_preprocessor_seconds": self.warm_preprocessor_seconds,
+        }
@@ -0,0 +1,134 @@
+import numpy as np
+
+from main import PACKET_TYPE_CODES, PACKET_TYPES, PacketType, by_packet_type, check_timings, packing_capacity
+
+
+class BatchAttackSimulation:
+    # Vectorized counterpart of AttackSimulation, which stays the per-packet reference implementation.
+    # Every second is drawn and packed with array operations: packets are laid out in arrival order over the
+    # fleet's in-flight load (a fluid version of first-fit), so no Preprocessor or Packet objects are created.
+    def __init__(self, device_capacity, virtual_capacity, processing_times, ttl_values, packet_types, seed=None):
+        check_timings(processing_times, ttl_values)
+        self.device_capacity = device_capacity
+        self.virtual_capacity = virtual_capacity
+        self.packing_capacity = packing_capacity(device_capacity, virtual_capacity)
+        self.rng = np.random.default_rng(seed)
+        self.type_codes = np.array([PACKET_TYPE_CODES[packet_type] for packet_type in packet_types])
+        self.processing_times = np.array(by_packet_type(processing_times), dtype=float)
+        self.ttl_values = np.array(by_packet_type(ttl_values), dtype=float)
+
+        self.fleet_size = 1
+        # Per-preprocessor counters, one row per physical preprocessor and one column per PacketType
+        self.type_counts = np.zeros((1, len(PACKET_TYPES)), dtype=np.int64)
+        self.expired_counts = np.zeros(1, dtype=np.int64)
+        # Fleet-wide running totals, so a per-second snapshot does not sum the per-preprocessor arrays
+        self.type_totals = np.zeros(len(PACKET_TYPES), dtype=np.int64)
+        self.expired_total = 0
+        self.preprocessor_seconds = 0
+
+        # Packets still in flight at the end of the last simulated second
+        self.inflight_departures = np.empty(0)
+        self.inflight_loads = np.empty(0, dtype=np.int64)
+        self.inflight_preprocessors = np.empty(0, dtype=np.int64)
+        self.inflight_expiring = np.empty(0, dtype=bool)
+
+        self.snapshots = []  # One row per simulated second, same columns as AttackSimulation.record_second
+
+    def draw_second(self, second, intensity):
+        # Same packets as AttackSimulation.schedule_second: virtual_capacity-sized loads spread evenly over the second
+        count = -(-intensity // self.virtual_capacity)
+        loads = np.full(count, self.virtual_capacity, dtype=np.int64)
+        if count and intensity % self.virtual_capacity:
+            loads[-1] = intensity % self.virtual_capacity
+        arrivals = second - 1 + np.arange(count) / max(count, 1)
+
+        types = self.type_codes[self.rng.integers(0, len(self.type_codes), count)]
+        ttls = self.ttl_values[types]
+        processing = self.processing_times[types]
+        # A packet leaves at its TTL or once processed, whichever is first
+        expiring = (ttls != -1) & (ttls <= processing)
+        departures = arrivals + np.where(expiring, ttls, processing) / 1e6
+        return loads, arrivals, types, expiring, departures
+
+    def run_second(self, second, intensity):
+        loads, arrivals, types, expiring, departures = self.draw_second(second, intensity)
+        count = len(loads)
+        carried_due = self.inflight_departures <= second
+        new_due = departures <= second
+
+        # Replay this second's arrivals and departures in time order, departures first on ties
+        times = np.concatenate((arrivals, departures[new_due], self.inflight_departures[carried_due]))
+        deltas = np.concatenate((loads, -loads[new_due], -self.inflight_loads[carried_due]))
+        kinds = np.concatenate((np.ones(count), np.zeros(len(times) - count)))
+        order = np.lexsort((kinds, times))
+        inflight_load = self.inflight_loads.sum() + np.cumsum(deltas[order])
+
+        # Each packet lands on the preprocessor holding the end of its load
+        load_after_arrival = np.empty(count, dtype=np.int64)
+        arrival_positions = order < count
+        load_after_arrival[order[arrival_positions]] = inflight_load[arrival_positions]
+        preprocessors = (load_after_arrival - 1) // self.packing_capacity
+
+        if count:
+            self.grow_fleet(int(preprocessors.max()) + 1)
+        cells = preprocessors * len(PACKET_TYPES) + types
+        self.type_counts += np.bincount(cells, minlength=self.type_counts.size).reshape(self.type_counts.shape)
+        self.type_totals += np.bincount(types, minlength=len(PACKET_TYPES))
+
+        departed_preprocessors = np.concatenate((self.inflight_preprocessors[carried_due], preprocessors[new_due]))
+        departed_expiring = np.concatenate((self.inflight_expiring[carried_due], expiring[new_due]))
+        self.expired_counts += np.bincount(departed_preprocessors[departed_expiring], minlength=self.fleet_size)
+        self.expired_total += int(departed_expiring.sum())
+
+        remaining = ~carried_due
+        staying = ~new_due
+        self.inflight_departures = np.concatenate((self.inflight_departures[remaining], departures[staying]))
+        self.inflight_loads = np.concatenate((self.inflight_loads[remaining], loads[staying]))
+        self.inflight_preprocessors = np.concatenate((self.inflight_preprocessors[remaining], preprocessors[staying]))
+        self.inflight_expiring = np.concatenate((self.inflight_expiring[remaining], expiring[staying]))
+
+    def grow_fleet(self, fleet_size):
+        # Like the per-packet model, the fleet never shrinks
+        if fleet_size <= self.fleet_size:
+            return
+        extra = fleet_size - self.fleet_size
+        self.type_counts = np.vstack((self.type_counts, np.zeros((extra, len(PACKET_TYPES)), dtype=np.int64)))
+        self.expired_counts = np.concatenate((self.expired_counts, np.zeros(extra, dtype=np.int64)))
+        self.fleet_size = fleet_size
+
+    def record_second(self, second):
+        self.preprocessor_seconds += self.fleet_size  # The fleet size is sampled once per second
+        total_load = int(self.inflight_loads.sum())
+        snapshot = {
+            "second": second,
+            "physical_preprocessors": self.fleet_size,
+            "virtual_preprocessors": len(self.inflight_loads),
+            # Average of per-preprocessor utilization, i.e. fleet load over fleet capacity
+            "average_utilization": total_load / (self.fleet_size * self.device_capacity) * 100,
+            "total_load": total_load,
+            "expired": self.expired_total,
+        }
+        snapshot.update(zip(PACKET_TYPES, self.type_totals.tolist()))
+        # Same billing and dropped columns as the per-packet model; batch mode has no scale-in, warm pool or classifier
+        snapshot.update(warm_preprocessors=0, preprocessor_seconds=self.preprocessor_seconds,
+                        warm_preprocessor_seconds=0, dropped=0)
+        self.snapshots.append(snapshot)
+        return snapshot
+
+    def preprocessor_rows(self):
+        # Same layout as main.preprocessor_rows
+        virtuals = np.bincount(self.inflight_preprocessors, minlength=self.fleet_size)
+        loads = np.bincount(self.inflight_preprocessors, weights=self.inflight_loads, minlength=self.fleet_size)
+        return [
+            {"preprocessor": f"P{idx}", "times_reused": int(counts[PacketType.UNCHECKED]),
+             **dict(zip(PACKET_TYPES, counts.tolist())), "expired": int(expired),
+             "virtual_preprocessors": int(virtual), "utilization": float(load / self.device_capacity * 100)}
+            for idx, (counts, expired, virtual, load) in enumerate(
+                zip(self.type_counts, self.expired_counts, virtuals, loads), 1)
+        ]
+
+    def run(self, intensities):
+        for second, intensity in enumerate(intensities, 1):
+            self.run_second(second, intensity)
+            self.record_second(second)
+        return self.type_counts
@@ -0,0 +1,647 @@
+import argparse
+import gc
+import ipaddress
+import json
+import os
+import random
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+import numpy as np
+
+from anomaly_detection import AnomalyDetector
+from concurrent_execution import ConcurrentFleet
+from dawn_sdn import DAWN_SDN_Defense, ListVersion
+from fleet_estimator import FleetEstimator, estimate_error
+from headless import config_intensities, load_config
+from ip_lookup import PrefixSet, int_to_ip, ip_to_int
+from main import (ARRIVAL, AttackSimulation, Packet, PacketType, Preprocessor, SimulationClock, build_packet_types,
+                  generate_intensities)
+from metrics import write_csv
+from placement import PLACEMENT_POLICIES, make_placement_policy
+from profiling import DISABLED_PROFILER, PhaseProfiler
+from rate_limiter import SourceRateLimiter
+from signature_matching import AhoCorasick
+
+# Slower processing than the headless defaults, so the fleet grows enough for placement to matter, and scale-in
+# with a warm pool, so a policy that leaves preprocessors drained gets to release them
+PLACEMENT_BENCHMARK_SETTINGS = [
+    ("processing_times.unchecked", 200000),
+    ("processing_times.whitelisted", 500000),
+    ("processing_times.blacklisted", 800000),
+    ("processing_times.signature-based", 1000000),
+    ("ttl_values.whitelisted", 300000),
+    ("flow_count", 1000),
+    ("scale_in_cooldown", 2),
+    ("warm_pool_size", 2),
+]
+
+
+class DictPacket:
+    # The packet layout before __slots__ and PacketType: a per-instance __dict__ and a string packet type
+    def __init__(self, load, timestamp, packet_type, ttl=-1):
+        self.load = load
+        self.timestamp = timestamp * 1e6  # Convert to microseconds
+        self.packet_type = packet_type
+        self.ttl = ttl
+
+
+def traced_bytes(build):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        kept = build()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del kept
+    return current
+
+def bytes_per_inflight_packet(packet_count):
+    def build_list_of_dict_packets():
+        # In-flight threads used to be a list of DictPackets
+        return [DictPacket(100, index / packet_count, "whitelisted", 120) for index in range(packet_count)]
+
+    def build_preprocessor():
+        # virtual_capacity=0 makes every packet its own in-flight virtual thread
+        preprocessor = Preprocessor(float("inf"), 0)
+        for index in range(packet_count):
+            preprocessor.add_packet(Packet(100, index / packet_count, PacketType.WHITELISTED, 120))
+        return preprocessor
+
+    return {
+        "before": traced_bytes(build_list_of_dict_packets) / packet_count,
+        "after": traced_bytes(build_preprocessor) / packet_count,
+    }
+
+
+class TimedPlacement:
+    # Wraps a placement policy and adds up the time spent deciding
+    def __init__(self, policy):
+        self.policy = policy
+        self.seconds = 0.0
+        self.decisions = 0
+
+    def choose(self, packet, preprocessors):
+        start = time.perf_counter()
+        preprocessor = self.policy.choose(packet, preprocessors)
+        self.seconds += time.perf_counter() - start
+        self.decisions += 1
+        return preprocessor
+
+
+class PlacementSimulation(AttackSimulation):
+    # Splits each second into packets of mixed load, 1 to virtual_capacity, since equal full-size packets pack the
+    # same way under every policy. Also records how unevenly load is spread over the fleet at the end of every second.
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.load_rng = random.Random(kwargs.get("seed"))  # Its own generator, so every policy sees the same loads
+
+    def schedule_second(self, second, intensity):
+        loads = []
+        while intensity > 0:
+            load = min(intensity, self.load_rng.randint(1, self.virtual_capacity))
+            loads.append(load)
+            intensity -= load
+        for position, load in enumerate(loads):
+            self.events.schedule(second - 1 + position / len(loads), ARRIVAL, load)
+
+    def record_second(self, second):
+        snapshot = super().record_second(second)
+        utilizations = [p.current_load / p.device_capacity * 100 for p in self.preprocessors]
+        snapshot["utilization_spread"] = statistics.pstdev(utilizations)
+        return snapshot
+
+
+def compare_placement_policies(config, policy_names=tuple(PLACEMENT_POLICIES)):
+    # Every policy replays the same packet stream: arrivals, loads, types and flows come from the simulation's own
+    # seeded generators, which no policy draws from
+    rows = []
+    for name in policy_names:
+        simulation = PlacementSimulation(config["device_capacity"], config["virtual_capacity"],
+                                         config["processing_times"], config["ttl_values"],
+                                         build_packet_types(config["packet_distribution"]), seed=config["seed"],
+                                         scale_in_cooldown=config["scale_in_cooldown"],
+                                         scale_in_utilization=config["scale_in_utilization"],
+                                         warm_pool_size=config["warm_pool_size"],
+                                         min_preprocessors=config["min_preprocessors"], flow_count=config["flow_count"])
+        timed_policy = TimedPlacement(make_placement_policy(name, simulation.allocation_index, config["seed"]))
+        simulation.placement_policy = timed_policy
+        simulation.run(config_intensities(config))
+        snapshots = simulation.snapshots
+        rows.append({
+            "policy": name,
+            "packets": timed_policy.decisions,
+            "allocation_latency_us": timed_policy.seconds / timed_policy.decisions * 1e6,
+            "peak_preprocessors": max(row["physical_preprocessors"] for row in snapshots),
+            "mean_utilization_spread": sum(row["utilization_spread"] for row in snapshots) / len(snapshots),
+            "preprocessor_seconds": snapshots[-1]["preprocessor_seconds"],
+        })
+    return rows
+
+
+def lookup_entries(entry_count, cidr_share, seed=0):
+    # Mostly single addresses plus some /16-/28 blocks, as dotted-quad strings the way lists arrive as feedback
+    rng = random.Random(seed)
+    entries = []
+    for _ in range(entry_count):
+        if rng.random() < cidr_share:
+            network = ipaddress.IPv4Network((rng.getrandbits(32), rng.randint(16, 28)), strict=False)
+            entries.append(str(network))
+        else:
+            entries.append(int_to_ip(rng.getrandbits(32)))
+    return entries
+
+def lookups_per_second(contains, queries):
+    start = time.perf_counter()
+    for query in queries:
+        contains(query)
+    return len(queries) / (time.perf_counter() - start)
+
+def compare_ip_lookups(entry_count, query_count, cidr_share=0.01, seed=0):
+    # The pseudo code's set of strings against PrefixSet, with and without its Bloom filter, and the batch path.
+    # Half the queries are listed single addresses, half are random addresses that mostly miss.
+    entries = lookup_entries(entry_count, cidr_share, seed)
+    rng = random.Random(seed + 1)
+    addresses = [entry for entry in entries if "/" not in entry]
+    queries = [rng.choice(addresses) if index % 2 else int_to_ip(rng.getrandbits(32))
+               for index in range(query_count)]
+    results = []
+
+    # Fresh string copies, so the strings count towards the set's memory as they would for a loaded list
+    start = time.perf_counter()
+    string_set = {entry.encode().decode() for entry in entries}
+    build_seconds = time.perf_counter() - start
+    results.append({"structure": "set of strings", "build_seconds": build_seconds,
+                    "bytes_per_entry": traced_bytes(lambda: {entry.encode().decode() for entry in entries}) / entry_count,
+                    "lookups_per_second": lookups_per_second(string_set.__contains__, queries)})
+    del string_set
+
+    for bloom_filter in (True, False):
+        start = time.perf_counter()
+        prefix_set = PrefixSet(entries, bloom_filter=bloom_filter)
+        len(prefix_set)  # Forces the build
+        build_seconds = time.perf_counter() - start
+        results.append({"structure": "PrefixSet + Bloom filter" if bloom_filter else "PrefixSet",
+                        "bytes_per_entry": prefix_set.nbytes() / entry_count, "build_seconds": build_seconds,
+                        "lookups_per_second": lookups_per_second(prefix_set.__contains__, queries)})
+
+    # The batch path, through the classifier, with the plain PrefixSet as its blacklist
+    defense = DAWN_SDN_Defense()
+    defense.lists = ListVersion(1, prefix_set, PrefixSet())
+    query_array = np.fromiter(map(ip_to_int, queries), dtype=np.uint32, count=query_count)
+    start = time.perf_counter()
+    defense.classify_batch(query_array)
+    results.append({"structure": "classify_batch (uint32 array)", "bytes_per_entry": prefix_set.nbytes() / entry_count,
+                    "build_seconds": build_seconds,
+                    "lookups_per_second": query_count / (time.perf_counter() - start)})
+    return results
+
+
+def signature_payloads(signatures, megabytes, packet_size, seed=0):
+    # Random payloads; one packet in a hundred carries a signature at a random offset
+    rng = random.Random(seed)
+    payloads = []
+    for _ in range(int(megabytes * 1e6) // packet_size):
+        payload = bytearray(rng.getrandbits(8 * packet_size).to_bytes(packet_size, "big"))
+        if rng.random() < 0.01:
+            signature = rng.choice(signatures)
+            offset = rng.randrange(packet_size - len(signature))
+            payload[offset:offset + len(signature)] = signature
+        payloads.append(bytes(payload))
+    return payloads
+
+def compare_signature_matching(signature_counts, megabytes, packet_size, seed=0):
+    # inspect_packet's workload: does any signature occur in the payload. The naive version runs one substring
+    # search per signature; the automaton reads each payload byte once.
+    rng = random.Random(seed)
+    rows = []
+    for signature_count in signature_counts:
+        signatures = [rng.getrandbits(8 * length).to_bytes(length, "big")
+                      for length in (rng.randint(8, 32) for _ in range(signature_count))]
+        payloads = signature_payloads(signatures, megabytes, packet_size, seed)
+        payload_megabytes = sum(map(len, payloads)) / 1e6
+
+        start = time.perf_counter()
+        naive_hits = sum(any(signature in payload for signature in signatures) for payload in payloads)
+        naive_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        automaton = AhoCorasick(signatures)
+        build_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        automaton_hits = sum(automaton.first_match(memoryview(payload)) is not None for payload in payloads)
+        automaton_seconds = time.perf_counter() - start
+        if automaton_hits != naive_hits:
+            raise RuntimeError("The automaton and the naive scan disagree")
+
+        rows.append({
+            "signatures": signature_count,
+            "naive_mb_per_second": payload_megabytes / naive_seconds,
+            "automaton_mb_per_second": payload_megabytes / automaton_seconds,
+            "build_seconds": build_seconds,
+            "table_megabytes": automaton.table.itemsize * len(automaton.table) / 1e6,
+        })
+    return rows
+
+
+def replay_rate_limiter(intensities, attack, rate, burst, max_sources, legit_sources=1000, legit_rate=2, seed=0):
+    # Each second carries legit_rate packets from each of legit_sources steady sources, plus `intensity` attack
+    # packets: from 100 heavy sources, or from a fresh random (spoofed) source every packet
+    rng = random.Random(seed)
+    clock = SimulationClock()
+    limiter = SourceRateLimiter(clock, rate, burst, max_sources)
+    attackers = [rng.getrandbits(32) for _ in range(100)]
+    legit = [rng.getrandbits(32) for _ in range(legit_sources)]
+    passed = {False: 0, True: 0}
+    packets = {False: 0, True: 0}
+    peak_sources = 0
+    elapsed = 0.0
+    for second, intensity in enumerate(intensities):
+        arrivals = [(second + rng.random(), rng.choice(legit), False) for _ in range(legit_sources * legit_rate)]
+        if attack == "spoofed":
+            arrivals += [(second + rng.random(), rng.getrandbits(32), True) for _ in range(intensity)]
+        else:
+            arrivals += [(second + rng.random(), rng.choice(attackers), True) for _ in range(intensity)]
+        arrivals.sort()
+
+        start = time.perf_counter()
+        allowed = []
+        for timestamp, source, _ in arrivals:
+            clock.advance_to(timestamp)
+            allowed.append(limiter.allow(source))
+        elapsed += time.perf_counter() - start
+
+        for (_, _, malicious), was_allowed in zip(arrivals, allowed):
+            packets[malicious] += 1
+            passed[malicious] += was_allowed
+        peak_sources = max(peak_sources, len(limiter))
+    return {
+        "attack": attack,
+        "legit_passed": passed[False] / packets[False] * 100,
+        "attack_passed": passed[True] / packets[True] * 100,
+        "peak_sources": peak_sources,
+        "evicted_sources": limiter.evicted_sources,
+        "us_per_packet": elapsed / (packets[False] + packets[True]) * 1e6,
+    }
+
+
+def detect_attack_curve(intensities, baseline_rate, quiet_seconds, window, top_k, seed=0):
+    # quiet_seconds of normal traffic (1000 sources to 1000 servers), the attack curve on top of it (spoofed sources,
+    # one victim), then quiet_seconds of normal traffic again
+    rng = random.Random(seed)
+    clock = SimulationClock()
+    detector = AnomalyDetector(clock, window=window, top_k=top_k)
+    legit_sources = [rng.getrandbits(32) for _ in range(1000)]
+    servers = [rng.getrandbits(32) for _ in range(1000)]
+    victim = rng.getrandbits(32)
+    attack_start = quiet_seconds
+    attack_end = quiet_seconds + len(intensities)
+    phases = [("ramp-up", attack_start, attack_start + 30), ("plateau", attack_start + 30, attack_end - 30),
+              ("ramp-down", attack_end - 30, attack_end), ("normal", 0, attack_start)]
+    flagged_seconds = {name: 0 for name, _, _ in phases}
+    checked = {False: 0, True: 0}
+    packets = {False: 0, True: 0}
+    elapsed = 0.0
+    for second in range(attack_end + quiet_seconds):
+        arrivals = [(second + rng.random(), rng.choice(legit_sources), rng.choice(servers), False)
+                    for _ in range(baseline_rate)]
+        if attack_start <= second < attack_end:
+            arrivals += [(second + rng.random(), rng.getrandbits(32), victim, True)
+                         for _ in range(intensities[second - attack_start])]
+        arrivals.sort()
+
+        start = time.perf_counter()
+        suspect = []
+        for timestamp, source, destination, _ in arrivals:
+            clock.advance_to(timestamp)
+            detector.observe(source, destination)
+            suspect.append(detector.is_suspect(source, destination))
+        elapsed += time.perf_counter() - start
+
+        for (_, _, _, malicious), was_suspect in zip(arrivals, suspect):
+            packets[malicious] += 1
+            checked[malicious] += was_suspect
+        for name, first, last in phases:
+            if first <= second < last or (name == "normal" and second >= attack_end):
+                flagged_seconds[name] += detector.anomalous
+
+    raised = [time for time in detector.raised_at if time >= attack_start]
+    cleared = [time for time in detector.cleared_at if time >= attack_end]
+    return {
+        "detection_latency_ms": (raised[0] - attack_start) * 1e3 if raised else None,
+        "clear_latency_s": cleared[0] - attack_end if cleared else None,
+        "flagged": {name: flagged_seconds[name] / (last - first if name != "normal" else 2 * quiet_seconds) * 100
+                    for name, first, last in phases},
+        "attack_checked": checked[True] / packets[True] * 100,
+        "legit_checked": checked[False] / packets[False] * 100,
+        "us_per_packet": elapsed / (packets[False] + packets[True]) * 1e6,
+    }
+
+
+def compare_concurrent_execution(device_capacities, virtual_capacities, backend, packet_count, signature_count,
+                                 max_preprocessors=None, seed=0):
+    # The same payloads through a real worker fleet for every capacity combination
+    rng = random.Random(seed)
+    signatures = [rng.getrandbits(8 * length).to_bytes(length, "big")
+                  for length in (rng.randint(8, 32) for _ in range(signature_count))]
+    matcher = AhoCorasick(signatures)
+    payloads = signature_payloads(signatures, packet_count * 1500 / 1e6, 1500, seed)
+    rows = []
+    for device_capacity in device_capacities:
+        for virtual_capacity in virtual_capacities:
+            fleet = ConcurrentFleet(matcher, device_capacity, virtual_capacity, backend,
+                                    max_preprocessors=max_preprocessors)
+            row = {"device_capacity": device_capacity, "virtual_capacity": virtual_capacity}
+            row.update(fleet.run(payloads))
+            rows.append(row)
+    return rows
+
+
+def scaling_run(config, intensity_scale, processing_scale, allocator):
+    # One point of the scaling grid. Packet count grows with intensity_scale and fleet size with processing_scale.
+    # Throughput comes from a clean run; the phase breakdown and peak memory come from separate profiled and
+    # traced runs, since both kinds of instrumentation slow the loop down.
+    processing_times = {name: value * processing_scale for name, value in config["processing_times"].items()}
+    intensities = [int(intensity * intensity_scale) for intensity in config_intensities(config)]
+
+    def build(profiler):
+        return AttackSimulation(config["device_capacity"], config["virtual_capacity"], processing_times,
+                                config["ttl_values"], build_packet_types(config["packet_distribution"]),
+                                seed=config["seed"], use_allocation_index=allocator == "index", profiler=profiler)
+
+    simulation = build(DISABLED_PROFILER)
+    started = time.perf_counter()
+    simulation.run(intensities)
+    elapsed = time.perf_counter() - started
+
+    profiler = PhaseProfiler()
+    build(profiler).run(intensities)
+    report = profiler.report()
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        build(DISABLED_PROFILER).run(intensities)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    packets = report["phases"]["allocate_packet_to_preprocessor"]["calls"]
+    row = {
+        "allocator": allocator,
+        "intensity_scale": intensity_scale,
+        "processing_scale": processing_scale,
+        "packets": packets,
+        "peak_preprocessors": max(snapshot["physical_preprocessors"] for snapshot in simulation.snapshots),
+        "packets_per_second": packets / elapsed,
+        "peak_memory_mb": peak / 1e6,
+        "mean_scan_length": report["counters"]["allocation_scan_length"]["mean"],
+        "max_scan_length": report["counters"]["allocation_scan_length"]["max"],
+        "mean_departure_sweep": report["counters"]["departure_sweep_length"]["mean"],
+    }
+    for phase, timing in report["phases"].items():
+        row[f"{phase}_us"] = timing["us_per_call"]
+    return row
+
+def compare_estimator(config, intensity_scales, processing_scales):
+    # The analytic estimate against a full packet simulation of the same inputs, over a grid of traffic volume
+    # and fleet size
+    rows = []
+    for processing_scale in processing_scales:
+        for intensity_scale in intensity_scales:
+            processing_times = {name: value * processing_scale for name, value in config["processing_times"].items()}
+            arguments = (config["device_capacity"], config["virtual_capacity"], processing_times,
+                         config["ttl_values"], build_packet_types(config["packet_distribution"]))
+            intensities = [int(intensity * intensity_scale) for intensity in config_intensities(config)]
+
+            estimator = FleetEstimator(*arguments)
+            started = time.perf_counter()
+            estimator.run(intensities)
+            estimate_seconds = time.perf_counter() - started
+
+            simulation = AttackSimulation(*arguments, seed=config["seed"])
+            started = time.perf_counter()
+            simulation.run(intensities)
+            simulation_seconds = time.perf_counter() - started
+
+            row = {
+                "intensity_scale": intensity_scale,
+                "processing_scale": processing_scale,
+                "simulated_peak": max(snapshot["physical_preprocessors"] for snapshot in simulation.snapshots),
+                "estimated_peak": max(snapshot["physical_preprocessors"] for snapshot in estimator.snapshots),
+                "estimate_ms": estimate_seconds * 1e3,
+                "simulation_ms": simulation_seconds * 1e3,
+                "speedup": simulation_seconds / estimate_seconds,
+            }
+            row.update(estimate_error(estimator.snapshots, simulation.snapshots))
+            rows.append(row)
+    return rows
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def compare_with_history(rows, history_path):
+    # Adds each run's throughput change against the latest stored run with the same parameters, then appends
+    # the new runs to the JSON-lines history
+    previous = {}
+    if os.path.exists(history_path):
+        with open(history_path) as history:
+            for line in history:
+                row = json.loads(line)
+                previous[(row["allocator"], row["intensity_scale"], row["processing_scale"])] = row
+    commit = current_commit()
+    recorded_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+    with open(history_path, "a") as history:
+        for row in rows:
+            baseline = previous.get((row["allocator"], row["intensity_scale"], row["processing_scale"]))
+            row["throughput_change"] = (row["packets_per_second"] / baseline["packets_per_second"] - 1) * 100 \
+                if baseline else None
+            history.write(json.dumps({"commit": commit, "recorded_at": recorded_at, **row}) + "\n")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for the DAWN preprocessor simulator.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    memory_parser = subparsers.add_parser("memory", help="Bytes per in-flight packet, before and after __slots__")
+    memory_parser.add_argument("--packets", type=int, default=1_000_000)
+
+    lookup_parser = subparsers.add_parser("lookup", help="Source-address lookups against large black/whitelists")
+    lookup_parser.add_argument("--entries", type=int, default=1_000_000)
+    lookup_parser.add_argument("--queries", type=int, default=1_000_000)
+    lookup_parser.add_argument("--cidr-share", type=float, default=0.01, help="Share of entries that are CIDR blocks")
+
+    signature_parser = subparsers.add_parser("signatures", help="Payload inspection throughput in MB/s")
+    signature_parser.add_argument("--signatures", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    signature_parser.add_argument("--megabytes", type=float, default=4)
+    signature_parser.add_argument("--packet-size", type=int, default=1500)
+
+    rate_parser = subparsers.add_parser("ratelimit", help="Per-source rate limiting over the generate_intensities curve")
+    rate_parser.add_argument("--attack", choices=["heavy", "spoofed"], action="append",
+                             help="Attack traffic from 100 heavy sources or spoofed random sources (default: both)")
+    rate_parser.add_argument("--rate", type=float, default=10, help="Packets per second allowed per source")
+    rate_parser.add_argument("--burst", type=float, default=20)
+    rate_parser.add_argument("--max-sources", type=int, default=100_000)
+    rate_parser.add_argument("--intensity-scale", type=float, default=1)
+
+    anomaly_parser = subparsers.add_parser("anomaly", help="Anomaly detection latency over the generate_intensities curve")
+    anomaly_parser.add_argument("--baseline-rate", type=int, default=1000, help="Normal packets per second")
+    anomaly_parser.add_argument("--quiet-seconds", type=int, default=30, help="Normal traffic before and after")
+    anomaly_parser.add_argument("--window", type=int, default=10, help="Baseline window, in one-second intervals")
+    anomaly_parser.add_argument("--top-k", type=int, default=64, help="Counters per heavy-hitter summary")
+    anomaly_parser.add_argument("--intensity-scale", type=float, default=1)
+
+    concurrent_parser = subparsers.add_parser("concurrent", help="Real inspection on worker pools with bounded queues")
+    concurrent_parser.add_argument("--backend", choices=["thread", "process"], default="process")
+    concurrent_parser.add_argument("--device-capacity", type=int, nargs="+", default=[1000])
+    concurrent_parser.add_argument("--virtual-capacity", type=int, nargs="+", default=[1000, 500, 250])
+    concurrent_parser.add_argument("--max-preprocessors", type=int, help="Fleet limit (default: one worker per core)")
+    concurrent_parser.add_argument("--packets", type=int, default=20000)
+    concurrent_parser.add_argument("--signatures", type=int, default=1000)
+    concurrent_parser.add_argument("--output", help="Also write the results to this CSV file")
+
+    scaling_parser = subparsers.add_parser("scaling", help="Simulator throughput, memory and phase costs as it scales")
+    scaling_parser.add_argument("--intensity-scales", type=float, nargs="+", default=[0.25, 1, 4])
+    scaling_parser.add_argument("--processing-scales", type=float, nargs="+", default=[1, 1000, 10000],
+                                help="Processing-time multipliers, which set the fleet size")
+    scaling_parser.add_argument("--allocators", nargs="+", choices=["index", "scan"], default=["index", "scan"])
+    scaling_parser.add_argument("--history", default="benchmark_history.jsonl",
+                                help="JSON-lines file the results are appended to and compared against")
+    scaling_parser.add_argument("--regression-threshold", type=float, default=20,
+                                help="Throughput drop (%%) reported as a regression")
+
+    estimator_parser = subparsers.add_parser("estimator", help="Analytic fleet-size estimate against the simulator")
+    estimator_parser.add_argument("--config", help="JSON configuration, as for headless.py")
+    estimator_parser.add_argument("--intensity-scales", type=float, nargs="+", default=[0.25, 1, 4])
+    estimator_parser.add_argument("--processing-scales", type=float, nargs="+", default=[1, 1000, 10000],
+                                  help="Processing-time multipliers, which set the fleet size")
+    estimator_parser.add_argument("--output", help="Also write the comparison to this CSV file")
+
+    placement_parser = subparsers.add_parser("placement", help="Replay one packet stream through every placement policy")
+    placement_parser.add_argument("--config", help="JSON configuration, as for headless.py")
+    placement_parser.add_argument("--policy", action="append", choices=list(PLACEMENT_POLICIES),
+                                  help="Policy to include (default: all)")
+    placement_parser.add_argument("--output", help="Also write the comparison to this CSV file")
+    args = parser.parse_args()
+
+    if args.command == "memory":
+        result = bytes_per_inflight_packet(args.packets)
+        print(f"In-flight packets: {args.packets}")
+        print(f"Bytes per packet before (__dict__ Packet in a list): {result['before']:.1f}")
+        print(f"Bytes per packet after (__slots__ Packet linked into a Preprocessor): {result['after']:.1f}")
+
+    elif args.command == "lookup":
+        rows = compare_ip_lookups(args.entries, args.queries, args.cidr_share)
+        print(f"Entries: {args.entries}, queries: {args.queries}")
+        print(f"{'Structure':<32}{'Bytes/entry':>13}{'Build (s)':>11}{'Lookups/s':>14}")
+        for row in rows:
+            print(f"{row['structure']:<32}{row['bytes_per_entry']:>13.1f}{row['build_seconds']:>11.2f}"
+                  f"{row['lookups_per_second']:>14,.0f}")
+
+    elif args.command == "signatures":
+        rows = compare_signature_matching(args.signatures, args.megabytes, args.packet_size)
+        print(f"{'Signatures':>10}{'Naive MB/s':>12}{'Automaton MB/s':>16}{'Build (s)':>11}{'Table MB':>10}")
+        for row in rows:
+            print(f"{row['signatures']:>10}{row['naive_mb_per_second']:>12.1f}{row['automaton_mb_per_second']:>16.1f}"
+                  f"{row['build_seconds']:>11.2f}{row['table_megabytes']:>10.1f}")
+
+    elif args.command == "ratelimit":
+        intensities = [int(intensity * args.intensity_scale) for intensity in generate_intensities()]
+        print(f"{'Attack':<9}{'Legit passed %':>16}{'Attack passed %':>17}{'Peak sources':>14}{'Evictions':>11}"
+              f"{'us/packet':>11}")
+        for attack in args.attack or ["heavy", "spoofed"]:
+            row = replay_rate_limiter(intensities, attack, args.rate, args.burst, args.max_sources)
+            print(f"{row['attack']:<9}{row['legit_passed']:>16.1f}{row['attack_passed']:>17.1f}"
+                  f"{row['peak_sources']:>14}{row['evicted_sources']:>11}{row['us_per_packet']:>11.2f}")
+
+    elif args.command == "anomaly":
+        intensities = [int(intensity * args.intensity_scale) for intensity in generate_intensities()]
+        result = detect_attack_curve(intensities, args.baseline_rate, args.quiet_seconds, args.window, args.top_k)
+        if result["detection_latency_ms"] is None:
+            print("The attack was not detected")
+        else:
+            print(f"Detection latency: {result['detection_latency_ms']:.0f} ms after the attack starts")
+        if result["clear_latency_s"] is None:
+            print("The anomaly had not cleared by the end of the run")
+        else:
+            print(f"Cleared: {result['clear_latency_s']:.1f} s after the attack ends")
+        for phase, share in result["flagged"].items():
+            print(f"Seconds flagged anomalous, {phase}: {share:.1f}%")
+        print(f"Attack packets sent to Check at Preprocessor: {result['attack_checked']:.1f}%")
+        print(f"Normal packets sent to Check at Preprocessor: {result['legit_checked']:.1f}%")
+        print(f"Detector cost: {result['us_per_packet']:.2f} us/packet")
+
+    elif args.command == "concurrent":
+        rows = compare_concurrent_execution(args.device_capacity, args.virtual_capacity, args.backend, args.packets,
+                                            args.signatures, args.max_preprocessors)
+        print(f"{'Device':>7}{'Virtual':>8}{'Fleet':>6}{'Workers':>8}{'Packets/s':>11}{'Mean queue':>11}"
+              f"{'Max queue':>10}{'p50 ms':>9}{'p99 ms':>9}{'p99.9 ms':>10}{'Blocked s':>10}")
+        for row in rows:
+            print(f"{row['device_capacity']:>7}{row['virtual_capacity']:>8}{row['preprocessors']:>6}"
+                  f"{row['workers']:>8}{row['packets_per_second']:>11,.0f}{row['mean_queue_depth']:>11.1f}"
+                  f"{row['max_queue_depth']:>10}{row['p50_latency_ms']:>9.2f}{row['p99_latency_ms']:>9.2f}"
+                  f"{row['p999_latency_ms']:>10.2f}{row['blocked_seconds']:>10.2f}")
+        if args.output:
+            write_csv(args.output, rows)
+
+    elif args.command == "scaling":
+        config = load_config()
+        rows = [scaling_run(config, intensity_scale, processing_scale, allocator)
+                for allocator in args.allocators
+                for processing_scale in args.processing_scales
+                for intensity_scale in args.intensity_scales]
+        compare_with_history(rows, args.history)
+        print(f"{'Allocator':<10}{'Intensity':>10}{'Processing':>11}{'Packets':>9}{'Fleet':>7}{'Packets/s':>11}"
+              f"{'Peak MB':>9}{'Scan mean':>10}{'Scan max':>9}{'Sweep':>7}{'Change %':>10}")
+        regressions = 0
+        for row in rows:
+            change = row["throughput_change"]
+            regression = change is not None and change < -args.regression_threshold
+            regressions += regression
+            print(f"{row['allocator']:<10}{row['intensity_scale']:>10g}{row['processing_scale']:>11g}"
+                  f"{row['packets']:>9}{row['peak_preprocessors']:>7}{row['packets_per_second']:>11,.0f}"
+                  f"{row['peak_memory_mb']:>9.1f}{row['mean_scan_length']:>10.1f}{row['max_scan_length']:>9}"
+                  f"{row['mean_departure_sweep']:>7.1f}{'' if change is None else f'{change:+.1f}':>10}"
+                  f"{'  REGRESSION' if regression else ''}")
+        print(f"Results appended to {args.history}")
+        if regressions:
+            raise SystemExit(f"{regressions} run(s) regressed by more than {args.regression_threshold}%")
+
+    elif args.command == "estimator":
+        rows = compare_estimator(load_config(args.config), args.intensity_scales, args.processing_scales)
+        print(f"{'Intensity':>10}{'Processing':>11}{'Peak (sim)':>11}{'Peak (est)':>11}{'Peak err %':>11}"
+              f"{'Fleet MAE':>10}{'Virtual MAE':>12}{'Util MAE':>9}{'Est ms':>8}{'Sim ms':>9}{'Speedup':>9}")
+        for row in rows:
+            print(f"{row['intensity_scale']:>10g}{row['processing_scale']:>11g}{row['simulated_peak']:>11}"
+                  f"{row['estimated_peak']:>11}{row['peak_physical_preprocessors_error']:>+11.1f}"
+                  f"{row['physical_preprocessors_mean_abs_error']:>10.2f}"
+                  f"{row['virtual_preprocessors_mean_abs_error']:>12.2f}"
+                  f"{row['average_utilization_mean_abs_error']:>9.2f}{row['estimate_ms']:>8.2f}"
+                  f"{row['simulation_ms']:>9.0f}{row['speedup']:>9,.0f}")
+        if args.output:
+            write_csv(args.output, rows)
+
+    elif args.command == "placement":
+        config = load_config(args.config, [] if args.config else PLACEMENT_BENCHMARK_SETTINGS)
+        rows = compare_placement_policies(config, args.policy or tuple(PLACEMENT_POLICIES))
+        print(f"{'Policy':<22}{'Packets':>10}{'Latency (us)':>14}{'Peak fleet':>12}{'Spread (pp)':>13}"
+              f"{'Preprocessor-s':>16}")
+        for row in rows:
+            print(f"{row['policy']:<22}{row['packets']:>10}{row['allocation_latency_us']:>14.2f}"
+                  f"{row['peak_preprocessors']:>12}{row['mean_utilization_spread']:>13.1f}"
+                  f"{row['preprocessor_seconds']:>16.0f}")
+        if args.output:
+            write_csv(args.output, rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+
+def inspect_worker(matcher, packets, results):
+    # One virtual preprocessor: inspects packets until the None sentinel, then reports what it measured.
+    # Latency runs from the moment the dispatcher took the packet, so it includes queueing and backpressure.
+    latencies = []
+    malicious = 0
+    while True:
+        item = packets.get()
+        if item is None:
+            break
+        arrived_at, payload = item
+        if matcher.first_match(payload) is not None:
+            malicious += 1
+        latencies.append(time.perf_counter() - arrived_at)
+    results.put((latencies, malicious))
+
+
+class WorkerGroup:
+    # One physical preprocessor: a bounded packet queue drained by one worker per virtual preprocessor.
+    # Worker processes are started with the given multiprocessing context. Forked workers share the compiled matcher
+    # copy-on-write; spawned ones (the default on Windows and macOS) are each sent a pickled copy.
+    def __init__(self, matcher, worker_count, queue_size, backend, results, context=None):
+        if backend == "process":
+            self.packets = context.Queue(queue_size)
+            self.workers = [context.Process(target=inspect_worker, args=(matcher, self.packets, results), daemon=True)
+                            for _ in range(worker_count)]
+        else:
+            self.packets = queue.Queue(queue_size)
+            self.workers = [threading.Thread(target=inspect_worker, args=(matcher, self.packets, results), daemon=True)
+                            for _ in range(worker_count)]
+        for worker in self.workers:
+            worker.start()
+
+    def offer(self, item):
+        try:
+            self.packets.put_nowait(item)
+            return True
+        except queue.Full:
+            return False
+
+    def depth(self):
+        return self.packets.qsize()
+
+    def stop(self):
+        for _ in self.workers:
+            self.packets.put(None)
+
+
+class ConcurrentFleet:
+    # A benchmark harness that times the inspection stage on real workers; it is not a mode of AttackSimulation.
+    # Each physical preprocessor is a WorkerGroup with device_capacity // virtual_capacity workers (its virtual
+    # preprocessors), on threads or processes. Payloads are handed first-fit to the groups' bounded queues, one queue
+    # slot each whatever their size. When every queue is full a new preprocessor is started, up to max_preprocessors;
+    # after that the dispatcher blocks on a full queue, which is the backpressure the traffic source sees.
+    # The fleet shares nothing with the simulated Preprocessor objects or allocate_packet_to_preprocessor, and
+    # payloads are expected to have been classified (monitor_traffic's "Check at Preprocessor") already.
+    # Every run() starts a fresh fleet and stops it at the end.
+    def __init__(self, matcher, device_capacity, virtual_capacity, backend="process", queue_per_worker=4,
+                 max_preprocessors=None, start_method=None):
+        if backend not in ("thread", "process"):
+            raise ValueError(f"Unknown worker backend: {backend}")
+        self.matcher = matcher
+        self.backend = backend
+        # None uses the platform's default start method, so the process backend also works where fork does not
+        self.context = multiprocessing.get_context(start_method) if backend == "process" else None
+        self.workers_per_preprocessor = max(device_capacity // virtual_capacity, 1)
+        self.queue_size = self.workers_per_preprocessor * queue_per_worker
+        if max_preprocessors is None:
+            max_preprocessors = max(os.cpu_count() // self.workers_per_preprocessor, 1)
+        self.max_preprocessors = max_preprocessors
+        self.results = self.context.Queue() if backend == "process" else queue.Queue()
+        self.groups = []
+        self.blocked_seconds = 0.0
+        self.next_blocking = 0
+
+    def start_preprocessor(self):
+        group = WorkerGroup(self.matcher, self.workers_per_preprocessor, self.queue_size, self.backend, self.results,
+                            self.context)
+        self.groups.append(group)
+        return group
+
+    def dispatch(self, payload):
+        item = (time.perf_counter(), payload)
+        for group in self.groups:
+            if group.offer(item):
+                return
+        if len(self.groups) < self.max_preprocessors:
+            self.start_preprocessor().packets.put(item)
+            return
+        # Every queue is full and the fleet is at its limit: wait, taking the full groups in turn
+        started = time.perf_counter()
+        self.groups[self.next_blocking].packets.put(item)
+        self.next_blocking = (self.next_blocking + 1) % len(self.groups)
+        self.blocked_seconds += time.perf_counter() - started
+
+    def queue_depth(self):
+        return sum(group.depth() for group in self.groups)
+
+    def run(self, payloads, sample_every=100):
+        # The previous run's workers have stopped, so their queues would never drain again
+        self.groups = []
+        self.blocked_seconds = 0.0
+        self.next_blocking = 0
+        depths = []
+        started = time.perf_counter()
+        for position, payload in enumerate(payloads):
+            self.dispatch(payload)
+            if position % sample_every == 0:
+                depths.append(self.queue_depth())
+        for group in self.groups:
+            group.stop()
+        latencies = []
+        malicious = 0
+        for _ in range(sum(len(group.workers) for group in self.groups)):
+            worker_latencies, worker_malicious = self.results.get()
+            latencies.extend(worker_latencies)
+            malicious += worker_malicious
+        elapsed = time.perf_counter() - started
+        for group in self.groups:
+            for worker in group.workers:
+                worker.join()
+        return execution_report(latencies, depths, elapsed, len(self.groups), self.workers_per_preprocessor,
+                                self.blocked_seconds, malicious)
+
+
+def percentile(ordered, share):
+    return ordered[min(int(share * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+def execution_report(latencies, depths, elapsed, preprocessors, workers_per_preprocessor, blocked_seconds, malicious):
+    latencies.sort()
+    return {
+        "packets": len(latencies),
+        "packets_per_second": len(latencies) / elapsed,
+        "preprocessors": preprocessors,
+        "workers": preprocessors * workers_per_preprocessor,
+        "mean_queue_depth": sum(depths) / len(depths) if depths else 0.0,
+        "max_queue_depth": max(depths, default=0),
+        "p50_latency_ms": percentile(latencies, 0.50) * 1e3,
+        "p99_latency_ms": percentile(latencies, 0.99) * 1e3,
+        "p999_latency_ms": percentile(latencies, 0.999) * 1e3,
+        "blocked_seconds": blocked_seconds,
+        "malicious": malicious,
+    }
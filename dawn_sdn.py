@@ -0,0 +1,193 @@
+from enum import IntEnum
+
+import numpy as np
+
+from feedback import FeedbackQueue
+from ip_lookup import PrefixSet, address_array, int_to_ip, ip_to_int, parse_range
+from main import PacketType
+from signature_matching import AhoCorasick, SignatureSet
+
+
+class Verdict(IntEnum):
+    BLOCK = 0
+    ALLOW = 1
+    RATE_LIMIT_EXCEEDED = 2
+    CHECK_AT_PREPROCESSOR = 3
+    UNPROCESSED = 4
+
+
+# The strings monitor_traffic returns in the pseudo code, indexed by Verdict
+VERDICT_NAMES = ["Block", "Allow", "Rate Limit Exceeded", "Check at Preprocessor", "Unprocessed"]
+# The packet type a verdict hands to the preprocessor fleet; rate-limited packets are dropped before allocation
+VERDICT_PACKET_TYPES = [PacketType.BLACKLISTED, PacketType.WHITELISTED, None, PacketType.SIGNATURE_BASED,
+                        PacketType.UNCHECKED]
+
+
+class ListVersion:
+    # One published version of the SDN's lists. It is never modified after publishing: updates build a new version
+    # and swap it in with a single attribute assignment, so a reader that took a version sees all of one update or
+    # none of it, without a lock.
+    def __init__(self, version, blacklist, whitelist):
+        self.version = version
+        self.blacklist = blacklist
+        self.whitelist = whitelist
+
+
+class DAWN_SDN_Defense:
+    # Executable DAWN_SDN_Defense from pseudo codes.py. It classifies a packet by its src_ip before the packet
+    # reaches allocate_packet_to_preprocessor. The lists are PrefixSets, so they hold CIDR blocks as well as
+    # single addresses, in 8 bytes per range instead of a Python string per address.
+    # Rate limiting is per source (a rate_limiter.SourceRateLimiter), so one noisy source is limited on its own
+    # instead of tripping a global traffic_rate check for everyone.
+    # An anomaly_detection.AnomalyDetector sees every packet and decides which unlisted traffic is worth a
+    # preprocessor's inspection; without one, unlisted traffic stays unprocessed.
+    # Preprocessor verdicts arrive in batches through a FeedbackQueue, and every applied batch publishes a new
+    # ListVersion. The main SDN is sent the changes since the last version it acknowledged.
+    def __init__(self, rate_limiter=None, anomaly_detector=None, bloom_filter=False, feedback_batch_size=1024):
+        self.lists = ListVersion(0, PrefixSet(bloom_filter=bloom_filter), PrefixSet(bloom_filter=bloom_filter))
+        self.signature_list = SignatureSet()
+        # Every Preprocessor_Defense handed the signature list, to be sent it again on changes; keyed by id() so
+        # registering is O(1) and in connection order
+        self.preprocessors = {}
+        self.rate_limiter = rate_limiter  # None disables rate limiting
+        self.anomaly_detector = anomaly_detector
+        self.feedback = FeedbackQueue(feedback_batch_size)
+        self.version = 0
+        self.deltas = []  # (version, blacklisted ranges, new signatures) not yet acknowledged by the main SDN
+        self.acknowledged_version = 0
+
+    @property
+    def blacklist(self):
+        return self.lists.blacklist
+
+    @property
+    def whitelist(self):
+        return self.lists.whitelist
+
+    def monitor_traffic(self, packet):
+        src_ip = packet.src_ip
+        if src_ip.__class__ is str:
+            src_ip = ip_to_int(src_ip)  # Once here rather than in every lookup below
+        dst_ip = getattr(packet, "dst_ip", None)
+        if self.anomaly_detector is not None:
+            self.anomaly_detector.observe(src_ip, dst_ip)
+        lists = self.lists
+        if src_ip in lists.blacklist:
+            return Verdict.BLOCK
+        elif src_ip in lists.whitelist:
+            return Verdict.ALLOW
+        elif self.rate_limiter is not None and not self.rate_limiter.allow(src_ip):
+            return Verdict.RATE_LIMIT_EXCEEDED
+        elif self.is_anomalous_traffic(src_ip, dst_ip):
+            return Verdict.CHECK_AT_PREPROCESSOR
+        else:
+            return Verdict.UNPROCESSED
+
+    def packet_type(self, packet):
+        # The packet type the fleet sees, or None for a dropped packet; for AttackSimulation.run_trace
+        return VERDICT_PACKET_TYPES[self.monitor_traffic(packet)]
+
+    def classify_batch(self, src_ips, dst_ips=None):
+        # monitor_traffic for many source addresses, all arriving at the current clock time, as a uint8 array of
+        # Verdicts. The list lookups are vectorized; the rate limiter and anomaly detector keep per-packet state,
+        # so with either of them the rest is a loop over the batch in order.
+        src_ips = address_array(src_ips)
+        lists = self.lists
+        verdicts = np.full(len(src_ips), Verdict.UNPROCESSED, dtype=np.uint8)
+        verdicts[lists.whitelist.contains_many(src_ips)] = Verdict.ALLOW
+        verdicts[lists.blacklist.contains_many(src_ips)] = Verdict.BLOCK  # The blacklist is checked first
+        if self.rate_limiter is None and self.anomaly_detector is None:
+            return verdicts
+        dst_ips = address_array(dst_ips).tolist() if dst_ips is not None else [None] * len(src_ips)
+        listed = (verdicts != Verdict.UNPROCESSED).tolist()
+        for position, (src_ip, dst_ip) in enumerate(zip(src_ips.tolist(), dst_ips)):
+            if self.anomaly_detector is not None:
+                self.anomaly_detector.observe(src_ip, dst_ip)
+            if listed[position]:
+                continue
+            if self.rate_limiter is not None and not self.rate_limiter.allow(src_ip):
+                verdicts[position] = Verdict.RATE_LIMIT_EXCEEDED
+            elif self.is_anomalous_traffic(src_ip, dst_ip):
+                verdicts[position] = Verdict.CHECK_AT_PREPROCESSOR
+        return verdicts
+
+    def update_lists(self, feedback_from_preprocessor):
+        # feedback_from_preprocessor is a dict with structure:
+        # {"add_to_blacklist": [addresses or CIDR blocks], "add_to_whitelist": [...]}
+        # Both lists are copied with the additions and published together as the next version.
+        add_to_blacklist = [parse_range(entry) for entry in feedback_from_preprocessor["add_to_blacklist"]]
+        add_to_whitelist = feedback_from_preprocessor["add_to_whitelist"]
+        if not add_to_blacklist and not add_to_whitelist:
+            return self.lists
+        lists = self.lists
+        self.version += 1
+        self.lists = ListVersion(self.version, lists.blacklist.with_entries(add_to_blacklist),
+                                 lists.whitelist.with_entries(add_to_whitelist))
+        if add_to_blacklist:
+            self.deltas.append((self.version, add_to_blacklist, []))
+        return self.lists
+
+    def apply_feedback(self):
+        # Publishes everything the connected preprocessors have reported since the last call as one new version
+        malicious, benign = self.feedback.drain()
+        return self.update_lists({"add_to_blacklist": list(malicious), "add_to_whitelist": list(benign)})
+
+    def connect_preprocessor(self, preprocessor):
+        preprocessor.feedback = self.feedback.writer(preprocessor)
+        self.distribute_signature_list(preprocessor)
+
+    def add_signatures(self, signatures):
+        known = len(self.signature_list)
+        self.signature_list.update(signatures)
+        if len(self.signature_list) > known:
+            self.version += 1
+            self.deltas.append((self.version, [], self.signature_list.signatures[known:]))
+            # One recompile (of just the new signatures, while they are few) shared by every preprocessor
+            for preprocessor in self.preprocessors.values():
+                self.distribute_signature_list(preprocessor)
+
+    def distribute_signature_list(self, preprocessor):
+        # Every preprocessor gets the same compiled matcher; it is only recompiled after signatures are added
+        self.preprocessors[id(preprocessor)] = preprocessor
+        preprocessor.receive_signature_list(self.signature_list.compiled())
+
+    def is_anomalous_traffic(self, src_ip, dst_ip=None):
+        return self.anomaly_detector is not None and self.anomaly_detector.is_suspect(src_ip, dst_ip)
+
+    def update_main_sdn(self, main_sdn):
+        # Sends the blacklist ranges and signatures added since the version the main SDN last acknowledged.
+        # receive_update returns the version it has applied (or None), and acknowledged deltas are dropped.
+        if not self.deltas:
+            return
+        threat_data = {
+            "from_version": self.acknowledged_version,
+            "version": self.version,
+            "blacklist": [(int_to_ip(first), int_to_ip(last)) for _, ranges, _ in self.deltas for first, last in ranges],
+            "new_signatures": [signature for _, _, signatures in self.deltas for signature in signatures],
+        }
+        acknowledged_version = main_sdn.receive_update(threat_data)
+        if acknowledged_version is not None:
+            self.acknowledged_version = acknowledged_version
+            self.deltas = [delta for delta in self.deltas if delta[0] > acknowledged_version]
+
+
+class Preprocessor_Defense:
+    def __init__(self):
+        self.signature_list = AhoCorasick(())
+        # Replaced with a writer to the SDN's queue by DAWN_SDN_Defense.connect_preprocessor. Until then verdicts
+        # collect in a queue of the preprocessor's own, in feedback.feedback_queue.
+        self.feedback = FeedbackQueue().writer(self)
+
+    def receive_signature_list(self, signature_list_from_sdn):
+        self.signature_list = signature_list_from_sdn
+
+    def inspect_packet(self, packet):
+        # packet.content is bytes, a memoryview or str; a signature anywhere in it makes the packet malicious
+        if self.signature_list.first_match(packet.content) is not None:
+            return "Malicious"
+        else:
+            return "Benign"
+
+    def feedback_to_sdn(self, packet, packet_inspection_result):
+        # Buffered and handed to the SDN in batches, instead of one feedback dict per inspected packet
+        self.feedback.report(packet.src_ip, packet_inspection_result == "Malicious")
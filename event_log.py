@@ -0,0 +1,72 @@
+import json
+import queue
+import threading
+
+DEBUG = 10  # Per-packet events: allocations, completions, expiries
+INFO = 20  # Fleet events: new preprocessors, per-second summaries
+WARNING = 30
+OFF = 100
+
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING, "off": OFF}
+LEVEL_NAMES = {level: name for name, level in LEVELS.items()}
+
+
+class EventLog:
+    # Structured JSON-lines event sink. Records are buffered and handed to a background thread in batches,
+    # so the simulation loop never waits on file I/O. Callers check the debug/info flags before building a
+    # record, which makes a disabled level cost one attribute lookup.
+    def __init__(self, path=None, level=OFF, batch_size=4096):
+        if isinstance(level, str):
+            level = LEVELS[level]
+        if path is None:
+            level = OFF
+        self.level = level
+        self.debug = level <= DEBUG
+        self.info = level <= INFO
+        self.warning = level <= WARNING
+        self.batch_size = batch_size
+        self.buffer = []
+        self.batches = None
+        self.writer = None
+        if level < OFF:
+            self.output = open(path, "w")
+            self.batches = queue.Queue()
+            self.writer = threading.Thread(target=self.write_batches, daemon=True)
+            self.writer.start()
+
+    def emit(self, level, event, time, **fields):
+        if level < self.level:
+            return
+        self.buffer.append({"time": time, "level": LEVEL_NAMES[level], "event": event, **fields})
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.batches.put(self.buffer)
+            self.buffer = []
+
+    def write_batches(self):
+        while True:
+            batch = self.batches.get()
+            if batch is None:
+                break
+            self.output.write("".join(json.dumps(record) + "\n" for record in batch))
+
+    def close(self):
+        if self.writer is None:
+            return
+        self.flush()
+        self.batches.put(None)
+        self.writer.join()
+        self.output.close()
+        self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+DISABLED_EVENT_LOG = EventLog()
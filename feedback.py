@@ -0,0 +1,69 @@
+import queue
+import threading
+
+
+class FeedbackQueue:
+    # Verdicts from the preprocessors to the SDN. Every preprocessor reports through its own FeedbackBuffer, which
+    # coalesces verdicts per source and hands them over in batches; the SDN drains the queue whenever it is ready
+    # to publish a new version of its lists. The queue is thread-safe, so preprocessors can run on other threads.
+    def __init__(self, batch_size=1024):
+        self.batch_size = batch_size
+        self.batches = queue.SimpleQueue()
+        self.writers = {}  # One FeedbackBuffer per reporting preprocessor, keyed by id()
+
+    def writer(self, owner):
+        # A reconnecting preprocessor gets a fresh buffer; whatever its old one still holds is handed over first
+        previous = self.writers.get(id(owner))
+        if previous is not None:
+            previous.flush()
+        writer = FeedbackBuffer(self, self.batch_size)
+        self.writers[id(owner)] = writer
+        return writer
+
+    def drain(self):
+        # Everything reported so far, coalesced into one (malicious sources, benign sources) pair. Partly filled
+        # batches are flushed first, so a quiet preprocessor's verdicts are not held back until its batch fills.
+        for writer in list(self.writers.values()):
+            writer.flush()
+        malicious, benign = set(), set()
+        while True:
+            try:
+                batch_malicious, batch_benign = self.batches.get_nowait()
+            except queue.Empty:
+                break
+            malicious |= batch_malicious
+            benign |= batch_benign
+        return malicious, benign - malicious
+
+
+class FeedbackBuffer:
+    # One preprocessor's pending verdicts. A source is reported once per batch however many of its packets were
+    # inspected, and a malicious verdict outranks a benign one. The lock lets the SDN flush a buffer that its
+    # preprocessor is still reporting into from another thread.
+    def __init__(self, feedback_queue, batch_size):
+        self.feedback_queue = feedback_queue
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self.malicious = set()
+        self.benign = set()
+        self.pending = 0
+
+    def report(self, src_ip, malicious):
+        with self.lock:
+            if malicious:
+                self.malicious.add(src_ip)
+            else:
+                self.benign.add(src_ip)
+            self.pending += 1
+            if self.pending >= self.batch_size:
+                self.hand_over()
+
+    def flush(self):
+        with self.lock:
+            self.hand_over()
+
+    def hand_over(self):
+        if self.pending:
+            self.feedback_queue.batches.put((self.malicious, self.benign - self.malicious))
+            self.malicious, self.benign = set(), set()
+            self.pending = 0
@@ -0,0 +1,111 @@
+import math
+
+import numpy as np
+
+from main import PACKET_TYPE_CODES, PACKET_TYPES, by_packet_type, check_timings, packing_capacity
+
+
+class FleetEstimator:
+    # Analytic counterpart of AttackSimulation for capacity planning: expected fleet size and utilization per
+    # second in milliseconds, without drawing any packets. Traffic is treated as a fluid. By Little's law the load
+    # in flight at time T is, per packet type, the load that arrived during the type's holding time before T,
+    # where the holding time is the processing time truncated by the TTL. Holding times are fixed, so the
+    # in-flight load is exact for the fluid and piecewise linear in T; the fleet is its running peak packed into
+    # whole preprocessors, as in batch mode. Takes the same arguments as BatchAttackSimulation except the seed, since
+    # nothing is drawn at random.
+    def __init__(self, device_capacity, virtual_capacity, processing_times, ttl_values, packet_types):
+        check_timings(processing_times, ttl_values)
+        self.device_capacity = device_capacity
+        self.virtual_capacity = virtual_capacity
+        self.packing_capacity = packing_capacity(device_capacity, virtual_capacity)
+        codes = [PACKET_TYPE_CODES[packet_type] for packet_type in packet_types]
+        self.shares = np.bincount(codes, minlength=len(PACKET_TYPES)) / len(codes)
+        processing = np.array(by_packet_type(processing_times), dtype=float)
+        ttls = np.array(by_packet_type(ttl_values), dtype=float)
+        # Same rule as schedule_packet_departure, in microseconds: a TTL of -1 means none
+        self.expiring = (ttls != -1) & (ttls <= processing)
+        self.holding_times = np.where(self.expiring, ttls, processing) / 1e6
+        self.snapshots = []
+        self.final_load = 0.0
+
+    def run(self, intensities):
+        intensities = np.asarray(intensities, dtype=float)
+        seconds = len(intensities)
+        packets = np.ceil(intensities / self.virtual_capacity)
+        # Cumulative load and packet counts at every whole second; the fluid arrives evenly within each second
+        cumulative_load = np.concatenate(([0.0], np.cumsum(intensities)))
+        cumulative_packets = np.concatenate(([0.0], np.cumsum(packets)))
+
+        def arrived(cumulative, times):
+            times = np.clip(times, 0, seconds)
+            whole = np.minimum(np.floor(times).astype(int), seconds - 1)
+            return cumulative[whole] + (cumulative[whole + 1] - cumulative[whole]) * (times - whole)
+
+        def in_flight(cumulative, times):
+            return sum(share * (arrived(cumulative, times) - arrived(cumulative, times - holding))
+                       for share, holding in zip(self.shares, self.holding_times) if share)
+
+        # The in-flight load only bends where some type's holding window crosses a whole second, so its peak
+        # within each second is at one of these offsets
+        offsets = np.unique(np.concatenate(([0.0, 1.0], self.holding_times % 1)))
+        starts = np.arange(seconds)
+        peak_load = in_flight(cumulative_load, starts[:, None] + offsets[None, :]).max(axis=1)
+        fleet = np.maximum.accumulate(np.maximum(np.ceil(peak_load / self.packing_capacity), 1))
+
+        ends = starts + 1.0
+        loads = in_flight(cumulative_load, ends)
+        threads = in_flight(cumulative_packets, ends)
+        expired = np.zeros(seconds)
+        for share, holding, expiring in zip(self.shares, self.holding_times, self.expiring):
+            if expiring:
+                expired += share * arrived(cumulative_packets, ends - holding)
+        type_counts = self.shares[None, :] * cumulative_packets[1:, None]
+        preprocessor_seconds = np.cumsum(fleet)
+
+        for second in range(seconds):
+            snapshot = {
+                "second": second + 1,
+                "physical_preprocessors": int(fleet[second]),
+                "virtual_preprocessors": float(threads[second]),
+                "average_utilization": float(loads[second] / (fleet[second] * self.device_capacity) * 100),
+                "total_load": float(loads[second]),
+                "expired": float(expired[second]),
+            }
+            snapshot.update(zip(PACKET_TYPES, type_counts[second].tolist()))
+            # Same billing and dropped columns as the other models; no scale-in, warm pool or classifier here
+            snapshot.update(warm_preprocessors=0, preprocessor_seconds=float(preprocessor_seconds[second]),
+                            warm_preprocessor_seconds=0, dropped=0)
+            self.snapshots.append(snapshot)
+        self.final_load = float(loads[-1]) if seconds else 0.0
+        return self.snapshots
+
+    def preprocessor_rows(self):
+        # Expected values only: counts are spread evenly over the fleet (rounded to whole packets), and the final
+        # load fills it first-fit
+        final = self.snapshots[-1]
+        fleet_size = final["physical_preprocessors"]
+        rows = []
+        remaining = self.final_load
+        for index in range(1, fleet_size + 1):
+            load = min(remaining, self.packing_capacity)
+            remaining -= load
+            rows.append({"preprocessor": f"P{index}", "times_reused": round(final[PACKET_TYPES[0]] / fleet_size),
+                         **{name: round(final[name] / fleet_size) for name in PACKET_TYPES},
+                         "expired": round(final["expired"] / fleet_size),
+                         "virtual_preprocessors": math.ceil(load / self.virtual_capacity),
+                         "utilization": load / self.device_capacity * 100})
+        return rows
+
+
+def estimate_error(estimated, simulated):
+    # Per-second error of an estimate against a simulation's snapshots
+    columns = ("physical_preprocessors", "virtual_preprocessors", "average_utilization")
+    report = {}
+    for column in columns:
+        errors = np.array([estimate[column] - actual[column] for estimate, actual in zip(estimated, simulated)])
+        report[f"{column}_mean_abs_error"] = float(np.abs(errors).mean())
+        report[f"{column}_max_abs_error"] = float(np.abs(errors).max())
+    peak_estimate = max(row["physical_preprocessors"] for row in estimated)
+    peak_simulated = max(row["physical_preprocessors"] for row in simulated)
+    report["peak_physical_preprocessors_error"] = (peak_estimate - peak_simulated) / peak_simulated * 100
+    return report
@@ -0,0 +1,265 @@
+import argparse
+import copy
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from anomaly_detection import AnomalyDetector
+from batch_simulation import BatchAttackSimulation
+from dawn_sdn import DAWN_SDN_Defense
+from event_log import LEVELS, EventLog
+from fleet_estimator import FleetEstimator, estimate_error
+from main import (PACKET_TYPES, AttackSimulation, build_packet_types, check_timings, generate_intensities,
+                  render_plots)
+from metrics import write_csv
+from placement import PLACEMENT_POLICIES
+from profiling import DISABLED_PROFILER, PhaseProfiler
+from rate_limiter import SourceRateLimiter
+from trace_replay import replay_trace
+
+# Same inputs simulate_attack asks for interactively
+DEFAULT_CONFIG = {
+    "intensities": "default",  # "default" for generate_intensities(), or a list of per-second intensities
+    "intensity_scale": 1,
+    "device_capacity": 1000,
+    "virtual_capacity": 100,
+    "processing_times": {"unchecked": 100, "whitelisted": 150, "blacklisted": 200, "signature-based": 250},
+    "ttl_values": {"unchecked": -1, "whitelisted": 120, "blacklisted": -1, "signature-based": -1},
+    "packet_distribution": {"unchecked": 25, "whitelisted": 25, "blacklisted": 25, "signature-based": 25},
+    "mode": "packet",  # "packet" for AttackSimulation, "batch" for BatchAttackSimulation, "estimate" for FleetEstimator
+    "seed": 0,
+    "event_log": None,  # Path of a JSON-lines event log, or null for none
+    "event_log_level": "info",  # "debug" also records every packet
+    "scale_in_cooldown": None,  # Seconds a preprocessor must sit drained before release; null keeps the fleet growing
+    "scale_in_utilization": 50,  # Releases stop once the remaining fleet would run above this utilization (%)
+    "warm_pool_size": 0,
+    "min_preprocessors": 1,
+    "placement": "first-fit",  # Any name in placement.PLACEMENT_POLICIES
+    "flow_count": None,  # Tag packets with one of this many synthetic flow IDs, for flow-affinity placement
+    "trace": None,  # Path of a pcap or CSV trace to replay instead of the intensities
+    "trace_speed": None,  # null replays as fast as possible, a number replays at that multiple of real time
+    "trace_load": 1,  # Load each trace packet puts on a preprocessor
+    "trace_classify": False,  # Type trace packets with DAWN_SDN_Defense.monitor_traffic instead of the configured mix
+    "trace_rate_limit": None,  # Packets per second allowed per source when classifying; null disables rate limiting
+    "profile": False,  # Time the simulation loop's phases and write profile.json
+    "compare": False,  # Also run the packet simulator and report the estimate's error; estimate mode only
+    "plots": True,  # Render PNG charts next to the CSV exports of a single run
+}
+# Settings only AttackSimulation models; the other modes require their defaults
+PACKET_MODE_SETTINGS = ("event_log", "scale_in_cooldown", "warm_pool_size", "min_preprocessors", "placement",
+                        "flow_count", "trace", "profile")
+
+
+def parse_value(text):
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return text
+
+def set_config_value(config, key, value):
+    # Dotted keys reach into nested settings, e.g. "processing_times.unchecked"
+    *parents, name = key.split(".")
+    for parent in parents:
+        config = config[parent]
+    if name not in config:
+        raise KeyError(f"Unknown configuration key: {key}")
+    config[name] = value
+
+def merge_config(config, updates, prefix=""):
+    for key, value in updates.items():
+        if isinstance(value, dict):
+            merge_config(config, value, f"{prefix}{key}.")
+        else:
+            set_config_value(config, prefix + key, value)
+
+def load_config(path=None, overrides=()):
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    if path:
+        with open(path) as config_file:
+            merge_config(config, json.load(config_file))
+    for key, value in overrides:
+        set_config_value(config, key, value)
+    validate_config(config)
+    return config
+
+def validate_config(config):
+    if sum(config["packet_distribution"].values()) != 100:
+        raise ValueError("packet_distribution percentages must add up to 100")
+    if config["mode"] not in ("packet", "batch", "estimate"):
+        raise ValueError(f"Unknown simulation mode: {config['mode']}")
+    if config["event_log_level"] not in LEVELS:
+        raise ValueError(f"Unknown event log level: {config['event_log_level']}")
+    if config["compare"] and config["mode"] != "estimate":
+        raise ValueError("compare needs estimate mode")
+    if config["min_preprocessors"] < 1:
+        raise ValueError("min_preprocessors must be at least 1")
+    if config["placement"] not in PLACEMENT_POLICIES:
+        raise ValueError(f"Unknown placement policy: {config['placement']}")
+    if config["mode"] != "packet":
+        # Batch and estimate modes model a grow-only, first-fit fleet with no log or profile, so these settings
+        # would be silently ignored there
+        for key in PACKET_MODE_SETTINGS:
+            if config[key] != DEFAULT_CONFIG[key]:
+                raise ValueError(f"{key} is only supported in packet mode, not in {config['mode']} mode")
+    for packet_type in PACKET_TYPES:
+        if packet_type not in config["processing_times"] or packet_type not in config["ttl_values"]:
+            raise ValueError(f"Missing processing time or TTL for {packet_type} packets")
+    check_timings(config["processing_times"], config["ttl_values"])
+
+def config_intensities(config):
+    intensities = generate_intensities() if config["intensities"] == "default" else config["intensities"]
+    return [int(intensity * config["intensity_scale"]) for intensity in intensities]
+
+def trace_classifier(config, clock):
+    # DAWN_SDN_Defense on the simulation clock: blocked, allowed, rate-limited and anomalous sources come out as the
+    # packet types monitor_traffic's verdicts map to, and rate-limited packets are dropped
+    rate_limiter = SourceRateLimiter(clock, config["trace_rate_limit"]) if config["trace_rate_limit"] else None
+    return DAWN_SDN_Defense(rate_limiter, AnomalyDetector(clock)).packet_type
+
+def run_simulation(config):
+    arguments = (config["device_capacity"], config["virtual_capacity"], config["processing_times"],
+                 config["ttl_values"], build_packet_types(config["packet_distribution"]))
+    if config["mode"] == "batch":
+        simulation = BatchAttackSimulation(*arguments, seed=config["seed"])
+        simulation.run(config_intensities(config))
+        return simulation
+    if config["mode"] == "estimate":
+        simulation = FleetEstimator(*arguments)
+        simulation.run(config_intensities(config))
+        return simulation
+    with EventLog(config["event_log"], level=config["event_log_level"]) as event_log:
+        simulation = AttackSimulation(*arguments, seed=config["seed"], event_log=event_log,
+                                      scale_in_cooldown=config["scale_in_cooldown"],
+                                      scale_in_utilization=config["scale_in_utilization"],
+                                      warm_pool_size=config["warm_pool_size"],
+                                      min_preprocessors=config["min_preprocessors"],
+                                      placement=config["placement"], flow_count=config["flow_count"],
+                                      profiler=PhaseProfiler() if config["profile"] else DISABLED_PROFILER)
+        if config["trace"]:
+            classify = trace_classifier(config, simulation.clock) if config["trace_classify"] else None
+            simulation.run_trace(replay_trace(config["trace"], config["trace_speed"]), classify,
+                                 load=config["trace_load"])
+        else:
+            simulation.run(config_intensities(config))
+    return simulation
+
+
+def compare_with_simulator(config, estimate):
+    # The estimate's per-second error against a packet-mode run of the same configuration
+    simulation = run_simulation({**config, "mode": "packet"})
+    return estimate_error(estimate.snapshots, simulation.snapshots)
+
+
+def summary_row(simulation):
+    snapshots = simulation.snapshots
+    summary = {
+        "peak_physical_preprocessors": max(row["physical_preprocessors"] for row in snapshots),
+        "peak_virtual_preprocessors": max(row["virtual_preprocessors"] for row in snapshots),
+        "mean_utilization": sum(row["average_utilization"] for row in snapshots) / len(snapshots),
+        "expired": snapshots[-1]["expired"],
+        "preprocessor_seconds": snapshots[-1]["preprocessor_seconds"],
+        "warm_preprocessor_seconds": snapshots[-1]["warm_preprocessor_seconds"],
+        "dropped": snapshots[-1]["dropped"],
+    }
+    for packet_type in PACKET_TYPES:
+        summary[packet_type] = snapshots[-1][packet_type]
+    return summary
+
+
+def run_headless(config, output_dir):
+    os.makedirs(output_dir, exist_ok=True)
+    simulation = run_simulation(config)
+    summary = summary_row(simulation)
+    per_second_path = os.path.join(output_dir, "per_second.csv")
+    preprocessors_path = os.path.join(output_dir, "preprocessors.csv")
+    write_csv(per_second_path, simulation.snapshots)
+    write_csv(preprocessors_path, simulation.preprocessor_rows())
+    if config["plots"]:
+        render_plots(per_second_path, preprocessors_path, output_dir)
+    report = {"config": config, "summary": summary}
+    if config["compare"]:
+        report["estimate_error"] = compare_with_simulator(config, simulation)
+    with open(os.path.join(output_dir, "summary.json"), "w") as summary_file:
+        json.dump(report, summary_file, indent=2)
+    if config["profile"]:
+        with open(os.path.join(output_dir, "profile.json"), "w") as profile_file:
+            json.dump(simulation.profiler.report(), profile_file, indent=2)
+    return summary
+
+
+def sweep_configs(base_config, grid):
+    # Every combination of the grid's values, applied on top of the base configuration
+    keys = list(grid)
+    for run, values in enumerate(itertools.product(*(grid[key] for key in keys)), 1):
+        config = copy.deepcopy(base_config)
+        for key, value in zip(keys, values):
+            set_config_value(config, key, value)
+        if config["event_log"]:
+            # Runs execute in parallel, so each one writes its own log: events.jsonl becomes events.1.jsonl, ...
+            root, extension = os.path.splitext(config["event_log"])
+            config["event_log"] = f"{root}.{run}{extension}"
+        validate_config(config)
+        yield dict(zip(keys, values)), config
+
+def run_sweep_job(config):
+    simulation = run_simulation(config)
+    summary = summary_row(simulation)
+    if config["compare"]:
+        summary.update(compare_with_simulator(config, simulation))
+    return summary
+
+def run_sweep(base_config, grid, output_path, workers=None):
+    parameters, configs = zip(*sweep_configs(base_config, grid))
+    # One simulation per core; results come back in grid order
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        summaries = list(executor.map(run_sweep_job, configs))
+    rows = [{**params, **summary} for params, summary in zip(parameters, summaries)]
+    write_csv(output_path, rows)
+    return rows
+
+
+def parse_assignment(text):
+    key, _, value = text.partition("=")
+    return key, parse_value(value)
+
+def parse_grid_assignment(text):
+    key, _, values = text.partition("=")
+    return key, [parse_value(value) for value in values.split(",")]
+
+def main():
+    parser = argparse.ArgumentParser(description="Run DAWN preprocessor simulations without prompts or plot windows.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run one simulation and write its results to a directory")
+    sweep_parser = subparsers.add_parser("sweep", help="Run a grid of simulations across a process pool")
+    for subparser in (run_parser, sweep_parser):
+        subparser.add_argument("--config", help="JSON file overriding the default configuration")
+        subparser.add_argument("--set", action="append", default=[], type=parse_assignment, metavar="KEY=VALUE",
+                               help="Override one setting, e.g. --set device_capacity=2000 --set mode=batch")
+    run_parser.add_argument("--output", default="results", help="Directory for the result files")
+    sweep_parser.add_argument("--grid", help="JSON file mapping setting names to lists of values")
+    sweep_parser.add_argument("--vary", action="append", default=[], type=parse_grid_assignment,
+                              metavar="KEY=V1,V2", help="Add a grid axis, e.g. --vary virtual_capacity=50,100")
+    sweep_parser.add_argument("--workers", type=int, help="Number of worker processes (default: one per core)")
+    sweep_parser.add_argument("--output", default="sweep.csv", help="CSV file for the merged results")
+    args = parser.parse_args()
+
+    config = load_config(args.config, args.set)
+    if args.command == "run":
+        summary = run_headless(config, args.output)
+        print(json.dumps(summary, indent=2))
+    else:
+        grid = {}
+        if args.grid:
+            with open(args.grid) as grid_file:
+                grid.update(json.load(grid_file))
+        grid.update(args.vary)
+        if not grid:
+            parser.error("sweep needs at least one --grid file or --vary axis")
+        rows = run_sweep(config, grid, args.output, args.workers)
+        print(f"Wrote {len(rows)} runs to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
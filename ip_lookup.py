@@ -0,0 +1,191 @@
+import bisect
+import ipaddress
+import math
+import socket
+from array import array
+
+import numpy as np
+
+UINT64_MASK = 0xFFFFFFFFFFFFFFFF
+
+
+def ip_to_int(address):
+    return int.from_bytes(socket.inet_aton(address), "big")
+
+def int_to_ip(value):
+    return socket.inet_ntoa(int(value).to_bytes(4, "big"))
+
+def parse_range(entry):
+    # An address ("10.1.2.3" or an int), a CIDR block ("10.0.0.0/8") or a (first, last) pair of ints,
+    # as an inclusive (first, last) pair
+    if isinstance(entry, tuple):
+        return entry
+    if isinstance(entry, str):
+        if "/" in entry:
+            network = ipaddress.IPv4Network(entry, strict=False)
+            return int(network.network_address), int(network.broadcast_address)
+        entry = ip_to_int(entry)
+    return int(entry), int(entry)
+
+def address_array(addresses):
+    # Dotted-quad strings or ints as a uint32 array, for the batch lookups
+    if isinstance(addresses, np.ndarray):
+        return addresses.astype(np.uint32, copy=False)
+    return np.fromiter((ip_to_int(a) if isinstance(a, str) else a for a in addresses), dtype=np.uint32,
+                       count=len(addresses))
+
+
+def mix64(keys):
+    # splitmix64 finalizer; works on Python ints and on uint64 arrays, where numpy wraps at 64 bits
+    if isinstance(keys, np.ndarray):
+        keys = keys.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+        keys = (keys ^ (keys >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        keys = (keys ^ (keys >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return keys ^ (keys >> np.uint64(31))
+    keys = (keys + 0x9E3779B97F4A7C15) & UINT64_MASK
+    keys = ((keys ^ (keys >> 30)) * 0xBF58476D1CE4E5B9) & UINT64_MASK
+    keys = ((keys ^ (keys >> 27)) * 0x94D049BB133111EB) & UINT64_MASK
+    return keys ^ (keys >> 31)
+
+
+class BloomFilter:
+    # Fixed-size bit array with hash_count bit positions per key, all derived from one 64-bit hash
+    # (double hashing). Sized up front for `capacity` keys at the given false-positive rate.
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.bit_count = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 64)
+        self.hash_count = max(round(self.bit_count / capacity * math.log(2)), 1)
+        self.bits = bytearray((self.bit_count + 7) // 8)
+
+    def add_many(self, keys):
+        hashes = mix64(np.asarray(keys, dtype=np.uint64))
+        first, step = hashes >> np.uint64(32), (hashes & np.uint64(0xFFFFFFFF)) | np.uint64(1)
+        bits = np.unpackbits(np.frombuffer(self.bits, dtype=np.uint8), bitorder="little")[:self.bit_count]
+        for i in range(self.hash_count):
+            bits[(first + np.uint64(i) * step) % np.uint64(self.bit_count)] = 1
+        self.bits[:] = np.packbits(bits, bitorder="little").tobytes()
+
+    def __contains__(self, key):
+        hashed = mix64(key)
+        position, step = hashed >> 32, (hashed & 0xFFFFFFFF) | 1
+        bits, bit_count = self.bits, self.bit_count
+        for _ in range(self.hash_count):
+            position %= bit_count
+            if not bits[position >> 3] >> (position & 7) & 1:
+                return False
+            position += step
+        return True
+
+    def contains_many(self, keys):
+        hashes = mix64(np.asarray(keys, dtype=np.uint64))
+        first, step = hashes >> np.uint64(32), (hashes & np.uint64(0xFFFFFFFF)) | np.uint64(1)
+        bits = np.frombuffer(self.bits, dtype=np.uint8)
+        found = np.ones(len(hashes), dtype=bool)
+        for i in range(self.hash_count):
+            positions = (first + np.uint64(i) * step) % np.uint64(self.bit_count)
+            found &= (bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1 == 1
+        return found
+
+
+class PrefixSet:
+    # A set of IPv4 addresses and CIDR blocks, kept as sorted, disjoint, inclusive [first, last] ranges in two
+    # packed uint32 arrays: 8 bytes per range, and a membership test is one bisect over the range starts.
+    # Additions are buffered and merged in on the next lookup, so bulk loads sort once.
+    # With bloom_filter=True, lookups first check the address's /24 block against a Bloom filter of every block
+    # the set touches, which answers most misses without the bisect.
+    BLOOM_BLOCK_BITS = 8  # /24 blocks
+    MAX_BLOOM_BLOCKS = 1 << 22  # Beyond this (e.g. a /0 or many /8s) the Bloom filter is skipped
+
+    def __init__(self, entries=(), bloom_filter=False, bloom_error_rate=0.01):
+        self.firsts = array("I")
+        self.lasts = array("I")
+        self.pending = []
+        self.use_bloom_filter = bloom_filter
+        self.bloom_error_rate = bloom_error_rate
+        self.bloom_filter = None
+        self.update(entries)
+
+    def add(self, entry):
+        self.pending.append(parse_range(entry))
+
+    def update(self, entries):
+        self.pending.extend(map(parse_range, entries))
+
+    def build(self):
+        pending = np.array(self.pending, dtype=np.int64).reshape(-1, 2)
+        self.pending = []
+        firsts = np.concatenate([np.frombuffer(self.firsts, dtype=np.uint32), pending[:, 0]]).astype(np.int64)
+        lasts = np.concatenate([np.frombuffer(self.lasts, dtype=np.uint32), pending[:, 1]]).astype(np.int64)
+        order = np.argsort(firsts, kind="stable")
+        firsts, lasts = firsts[order], lasts[order]
+        # A range starts a new merged range unless it overlaps or touches everything before it
+        covered = np.maximum.accumulate(lasts)
+        starts = np.ones(len(firsts), dtype=bool)
+        starts[1:] = firsts[1:] > covered[:-1] + 1
+        start_positions = np.flatnonzero(starts)
+        self.firsts = array("I", firsts[start_positions].astype(np.uint32).tobytes())
+        self.lasts = array("I", np.maximum.reduceat(lasts, start_positions).astype(np.uint32).tobytes()
+                           if len(start_positions) else b"")
+        self.build_bloom_filter()
+
+    def with_entries(self, entries):
+        # A new, fully built set with this set's ranges plus `entries`; this set is not modified
+        if self.pending:
+            self.build()
+        updated = PrefixSet(bloom_filter=self.use_bloom_filter, bloom_error_rate=self.bloom_error_rate)
+        updated.firsts, updated.lasts = self.firsts, self.lasts  # build() replaces rather than modifies these
+        updated.update(entries)
+        updated.build()
+        return updated
+
+    def build_bloom_filter(self):
+        self.bloom_filter = None
+        if not self.use_bloom_filter or not self.firsts:
+            return
+        first_blocks = np.frombuffer(self.firsts, dtype=np.uint32).astype(np.int64) >> self.BLOOM_BLOCK_BITS
+        last_blocks = np.frombuffer(self.lasts, dtype=np.uint32).astype(np.int64) >> self.BLOOM_BLOCK_BITS
+        block_counts = last_blocks - first_blocks + 1
+        if block_counts.sum() > self.MAX_BLOOM_BLOCKS:
+            return
+        # Every block of every range: each range's first block plus 0, 1, ... up to its block count
+        offsets = np.arange(block_counts.sum()) - np.repeat(np.cumsum(block_counts) - block_counts, block_counts)
+        blocks = np.unique(np.repeat(first_blocks, block_counts) + offsets)
+        self.bloom_filter = BloomFilter(len(blocks), self.bloom_error_rate)
+        self.bloom_filter.add_many(blocks)
+
+    def __contains__(self, address):
+        if self.pending:
+            self.build()
+        if address.__class__ is str:
+            address = ip_to_int(address)
+        if self.bloom_filter is not None and address >> self.BLOOM_BLOCK_BITS not in self.bloom_filter:
+            return False
+        position = bisect.bisect_right(self.firsts, address) - 1
+        return position >= 0 and address <= self.lasts[position]
+
+    def contains_many(self, addresses):
+        # Batch membership for an array (or sequence) of addresses; returns a boolean array
+        if self.pending:
+            self.build()
+        addresses = address_array(addresses)
+        if not self.firsts:
+            return np.zeros(len(addresses), dtype=bool)
+        firsts = np.frombuffer(self.firsts, dtype=np.uint32)
+        lasts = np.frombuffer(self.lasts, dtype=np.uint32)
+        positions = np.searchsorted(firsts, addresses, side="right") - 1
+        return (positions >= 0) & (addresses <= lasts[np.maximum(positions, 0)])
+
+    def __len__(self):
+        # Number of merged ranges, not of addresses
+        if self.pending:
+            self.build()
+        return len(self.firsts)
+
+    def ranges(self):
+        if self.pending:
+            self.build()
+        return [(int_to_ip(first), int_to_ip(last)) for first, last in zip(self.firsts, self.lasts)]
+
+    def nbytes(self):
+        bloom_bytes = len(self.bloom_filter.bits) if self.bloom_filter is not None else 0
+        return self.firsts.itemsize * (len(self.firsts) + len(self.lasts)) + bloom_bytes
@@ -1,100 +1,442 @@
-
-import time
+import functools
+import heapq
+import itertools
+import os
 import random
+import time
+from enum import IntEnum
+
+import matplotlib
+matplotlib.use("Agg")  # Plots are written to image files and never block the run
 import matplotlib.pyplot as plt
 
+from allocation_index import AllocationIndex
+from autoscaler import Autoscaler
+from event_log import DEBUG, DISABLED_EVENT_LOG, INFO, EventLog
+from metrics import FleetMetrics, read_csv, write_csv
+from placement import make_placement_policy
+from profiling import DISABLED_PROFILER
+
+# Event kinds for the discrete-event engine, in the order they are handled when they share a timestamp.
+# Expiries and completions go first so capacity is freed before new arrivals are allocated.
+TTL_EXPIRY = 0
+PROCESSING_COMPLETE = 1
+ARRIVAL = 2
+
+
+
+class PacketType(IntEnum):
+    UNCHECKED = 0
+    WHITELISTED = 1
+    BLACKLISTED = 2
+    SIGNATURE_BASED = 3
+
+
+# Configuration names of the packet types, indexed by PacketType
+PACKET_TYPES = ["unchecked", "whitelisted", "blacklisted", "signature-based"]
+PACKET_TYPE_CODES = {name: PacketType(code) for code, name in enumerate(PACKET_TYPES)}
+
+
+def by_packet_type(values):
+    # Turns a {"unchecked": ..., ...} setting into a list indexed by PacketType
+    return [values[name] for name in PACKET_TYPES]
+
+def check_timings(processing_times, ttl_values):
+    # Both in microseconds; a TTL of -1 means the packet type has none
+    for packet_type in PACKET_TYPES:
+        if processing_times[packet_type] < 0:
+            raise ValueError(f"Processing time for {packet_type} packets must not be negative")
+        if ttl_values[packet_type] < 0 and ttl_values[packet_type] != -1:
+            raise ValueError(f"TTL for {packet_type} packets must be -1 (no TTL) or at least 0")
+
+def packing_capacity(device_capacity, virtual_capacity):
+    # Load one preprocessor holds in the vectorized models: full-size packets can only fill whole multiples of
+    # virtual_capacity on a device
+    return max(device_capacity // virtual_capacity, 1) * virtual_capacity
+
 
 class Packet:
-    def __init__(self, load, timestamp, packet_type, ttl=-1):
+    # Fixed slots instead of a per-instance __dict__; packet_type is a PacketType.
+    # previous_thread/next_thread link the in-flight virtual threads of one Preprocessor.
+    __slots__ = ("load", "timestamp", "packet_type", "ttl", "flow_id", "previous_thread", "next_thread")
+
+    def __init__(self, load, timestamp, packet_type, ttl=-1, flow_id=None):
         self.load = load
         self.timestamp = timestamp * 1e6  # Convert to microseconds
         self.packet_type = packet_type
         self.ttl = ttl
+        self.flow_id = flow_id  # Optional flow key, used by flow-affinity placement
+        self.previous_thread = None
+        self.next_thread = None
 
 
 class Preprocessor:
-    def __init__(self, device_capacity, virtual_capacity):
+    def __init__(self, device_capacity, virtual_capacity, preprocessor_id=None):
+        self.preprocessor_id = preprocessor_id  # Stable ID for logs, independent of the position in the fleet list
         self.device_capacity = device_capacity
         self.virtual_capacity = virtual_capacity
-        self.threads = []
+        # In-flight virtual threads form a linked list in arrival order, so a departing thread is unlinked in O(1)
+        # without a per-thread container entry
+        self.newest_thread = None
+        self.thread_count = 0
         self.current_load = 0
-        self.total_unchecked_packets = 0
-        self.total_whitelisted_packets = 0
-        self.total_blacklisted_packets = 0
-        self.total_signature_packets = 0
+        self.type_counts = [0] * len(PacketType)  # Packets received, indexed by PacketType
         self.times_reused = 0
         self.total_expired_packets = 0
+        self.allocation_index = None  # Set by AllocationIndex.track, which also assigns index_position
+        self.index_position = None
+        self.metrics = None  # Set by FleetMetrics.track
+        self.autoscaler = None  # Told when the preprocessor drains or gets busy again
 
     def add_packet(self, packet):
-        if not self.threads or self.threads[-1].load >= self.virtual_capacity:
-            self.threads.append(packet)
+        last_thread = self.newest_thread
+        opened_thread = last_thread is None or last_thread.load >= self.virtual_capacity
+        if opened_thread:
+            packet.previous_thread = last_thread
+            if last_thread is not None:
+                last_thread.next_thread = packet
+            self.newest_thread = packet
+            self.thread_count += 1
         else:
-            self.threads[-1].load += packet.load
+            last_thread.load += packet.load
         self.current_load += packet.load
 
-        if packet.packet_type == "unchecked":
-            self.total_unchecked_packets += 1
+        self.type_counts[packet.packet_type] += 1
+        if packet.packet_type == PacketType.UNCHECKED:
             self.times_reused += 1
-        elif packet.packet_type == "whitelisted":
-            self.total_whitelisted_packets += 1
-        elif packet.packet_type == "blacklisted":
-            self.total_blacklisted_packets += 1
-        elif packet.packet_type == "signature-based":
-            self.total_signature_packets += 1
+
+        if self.allocation_index is not None:
+            self.allocation_index.update(self)
+        if self.metrics is not None:
+            self.metrics.packet_added(packet, opened_thread)
+        if self.autoscaler is not None and self.thread_count == 1:
+            self.autoscaler.preprocessor_busy(self)
+
+    def last_thread(self):
+        return self.newest_thread
 
     def remove_packet(self, packet):
-        self.threads.remove(packet)
+        if packet.previous_thread is not None:
+            packet.previous_thread.next_thread = packet.next_thread
+        if packet.next_thread is not None:
+            packet.next_thread.previous_thread = packet.previous_thread
+        else:
+            self.newest_thread = packet.previous_thread
+        packet.previous_thread = packet.next_thread = None
+        self.thread_count -= 1
         self.current_load -= packet.load
+        if self.allocation_index is not None:
+            self.allocation_index.update(self)
+        if self.metrics is not None:
+            self.metrics.packet_removed(packet)
+        if self.autoscaler is not None and self.thread_count == 0:
+            self.autoscaler.preprocessor_drained(self)
+
+    def expire_packet(self, packet):
+        self.remove_packet(packet)
+        self.total_expired_packets += 1
+        if self.metrics is not None:
+            self.metrics.packet_expired()
 
 
-def generate_packet(load, packet_types, ttl_values):
-    packet_type = random.choice(packet_types)
+class SimulationClock:
+    def __init__(self, start=0.0):
+        self.now = start  # Simulated time in seconds
+
+    def advance_to(self, timestamp):
+        if timestamp < self.now:
+            raise ValueError(f"Cannot move the simulation clock back from {self.now} to {timestamp}")
+        self.now = timestamp
+
+
+class EventQueue:
+    def __init__(self):
+        self.heap = []
+        self.sequence = itertools.count()  # Keeps events with the same time and kind in scheduling order
+
+    def schedule(self, timestamp, kind, payload, preprocessor=None):
+        heapq.heappush(self.heap, (timestamp, kind, next(self.sequence), payload, preprocessor))
+
+    def pop(self):
+        timestamp, kind, _, payload, preprocessor = heapq.heappop(self.heap)
+        return timestamp, kind, payload, preprocessor
+
+    def next_time(self):
+        return self.heap[0][0]
+
+    def __len__(self):
+        return len(self.heap)
+
+
+def generate_packet(load, packet_types, ttl_values, clock, rng=random, flow_count=None):
+    # packet_types holds PacketType codes and ttl_values is indexed by them
+    packet_type = rng.choice(packet_types)
     ttl = ttl_values[packet_type]
-    return Packet(load, time.time(), packet_type, ttl)
-
-def check_and_remove_expired_packets(preprocessor, processing_times, preprocessors):
-    current_time_microseconds = time.time() * 1e6  # Convert current time to microseconds
-    for packet in preprocessor.threads[:]:
-        if packet.ttl != -1 and current_time_microseconds - packet.timestamp >= packet.ttl:
-            preprocessor.total_expired_packets += 1
-            preprocessor.remove_packet(packet)
-            print(f"Packet of size {packet.load} and type {packet.packet_type} has expired TTL in Preprocessor {preprocessors.index(preprocessor) + 1}")
-            # remove these lines if ttl and adding to unchecked is causing delay, might be better to drop
-            # Create a new packet with the same load but marked as "unchecked"
-            # unchecked_packet = Packet(packet.load, time.time(), "unchecked")
-            # preprocessor.add_packet(unchecked_packet)
-
-            # # Remove the expired packet
-            # preprocessor.remove_packet(packet)
-        elif current_time_microseconds - packet.timestamp >= processing_times[packet.packet_type]:
-            preprocessor.remove_packet(packet)
-            print(f"Packet of size {packet.load} and type {packet.packet_type} has finished processing in Preprocessor {preprocessors.index(preprocessor) + 1}")
-
-def allocate_packet_to_preprocessor(packet, preprocessors, device_capacity, virtual_capacity, processing_times):
-    for preprocessor in preprocessors:
-        check_and_remove_expired_packets(preprocessor, processing_times, preprocessors)
-
-        # Check for an available virtual preprocessor
-        if preprocessor.threads and preprocessor.threads[-1].load + packet.load <= virtual_capacity:
+    flow_id = rng.randrange(flow_count) if flow_count else None
+    return Packet(load, clock.now, packet_type, ttl, flow_id)
+
+def schedule_packet_departure(events, packet, preprocessor, processing_times, now):
+    # A virtual thread leaves its preprocessor when its TTL runs out or its processing finishes, whichever is first.
+    # Deadlines count from the clock (the packet's arrival) rather than packet.timestamp, whose microsecond round
+    # trip can land just before the clock and so schedule a zero-length hold in the past.
+    processing_time = processing_times[packet.packet_type]
+    if packet.ttl != -1 and packet.ttl <= processing_time:
+        events.schedule(now + packet.ttl / 1e6, TTL_EXPIRY, packet, preprocessor)
+    else:
+        events.schedule(now + processing_time / 1e6, PROCESSING_COMPLETE, packet, preprocessor)
+
+def handle_packet_departure(kind, packet, preprocessor, clock, event_log=DISABLED_EVENT_LOG):
+    if kind == TTL_EXPIRY:
+        preprocessor.expire_packet(packet)
+        if event_log.debug:
+            event_log.emit(DEBUG, "ttl-expired", clock.now, preprocessor=preprocessor.preprocessor_id,
+                           load=packet.load, packet_type=PACKET_TYPES[packet.packet_type])
+        # remove these lines if ttl and adding to unchecked is causing delay, might be better to drop
+        # Create a new packet with the same load but marked as "unchecked"
+        # unchecked_packet = Packet(packet.load, clock.now, "unchecked")
+        # preprocessor.add_packet(unchecked_packet)
+    else:
+        preprocessor.remove_packet(packet)
+        if event_log.debug:
+            event_log.emit(DEBUG, "processing-complete", clock.now, preprocessor=preprocessor.preprocessor_id,
+                           load=packet.load, packet_type=PACKET_TYPES[packet.packet_type])
+
+def log_allocation(event_log, packet, preprocessor):
+    event_log.emit(DEBUG, "packet-allocated", packet.timestamp / 1e6, preprocessor=preprocessor.preprocessor_id,
+                   load=packet.load, packet_type=PACKET_TYPES[packet.packet_type])
+
+def allocate_packet_to_preprocessor(packet, preprocessors, device_capacity, virtual_capacity, allocation_index=None,
+                                    event_log=DISABLED_EVENT_LOG, metrics=None, autoscaler=None, placement_policy=None):
+    if placement_policy is not None:
+        # A pluggable policy from placement.py; None means nothing in the fleet suits the packet
+        preprocessor = placement_policy.choose(packet, preprocessors)
+        if preprocessor is not None:
             preprocessor.add_packet(packet)
-            return
-        # Check for an underutilized physical preprocessor
-        elif preprocessor.current_load + packet.load <= device_capacity:
+            if event_log.debug:
+                log_allocation(event_log, packet, preprocessor)
+            return preprocessor
+    elif allocation_index is not None:
+        # Same first-fit choice as the scan below, found in O(log P)
+        preprocessor = allocation_index.first_fit(packet.load)
+        if preprocessor is not None:
             preprocessor.add_packet(packet)
-            return
-
-    # If no available space in current preprocessors, start a new one
-    new_preprocessor = Preprocessor(device_capacity, virtual_capacity)
+            if event_log.debug:
+                log_allocation(event_log, packet, preprocessor)
+            return preprocessor
+    else:
+        for preprocessor in preprocessors:
+            # Check for an available virtual preprocessor
+            last_thread = preprocessor.last_thread()
+            if last_thread is not None and last_thread.load + packet.load <= virtual_capacity:
+                preprocessor.add_packet(packet)
+                if event_log.debug:
+                    log_allocation(event_log, packet, preprocessor)
+                return preprocessor
+            # Check for an underutilized physical preprocessor
+            elif preprocessor.current_load + packet.load <= device_capacity:
+                preprocessor.add_packet(packet)
+                if event_log.debug:
+                    log_allocation(event_log, packet, preprocessor)
+                return preprocessor
+
+    # If no available space in current preprocessors, start a new one (or bring back a warm one)
+    if autoscaler is not None:
+        new_preprocessor = autoscaler.provision()
+    else:
+        new_preprocessor = Preprocessor(device_capacity, virtual_capacity, len(preprocessors) + 1)
     new_preprocessor.add_packet(packet)
     preprocessors.append(new_preprocessor)
-    print(f"New Preprocessor {len(preprocessors)} initialized with load: {packet.load}/{new_preprocessor.device_capacity}")
-
-def plot_packet_distribution(preprocessors):
-    labels = [f"P{idx+1}" for idx in range(len(preprocessors))]
-    unchecked = [p.total_unchecked_packets for p in preprocessors]
-    whitelisted = [p.total_whitelisted_packets for p in preprocessors]
-    blacklisted = [p.total_blacklisted_packets for p in preprocessors]
-    signature_based = [p.total_signature_packets for p in preprocessors]
+    if allocation_index is not None:
+        allocation_index.track(new_preprocessor)
+    if metrics is not None and new_preprocessor.metrics is None:
+        metrics.track(new_preprocessor)
+    if event_log.info:
+        event_log.emit(INFO, "preprocessor-started", packet.timestamp / 1e6,
+                       preprocessor=new_preprocessor.preprocessor_id, load=packet.load,
+                       device_capacity=new_preprocessor.device_capacity)
+    return new_preprocessor
+
+
+class AttackSimulation:
+    def __init__(self, device_capacity, virtual_capacity, processing_times, ttl_values, packet_types, seed=None,
+                 use_allocation_index=True, event_log=DISABLED_EVENT_LOG, scale_in_cooldown=None,
+                 scale_in_utilization=50, warm_pool_size=0, min_preprocessors=1, placement="first-fit",
+                 flow_count=None, profiler=DISABLED_PROFILER):
+        check_timings(processing_times, ttl_values)
+        self.device_capacity = device_capacity
+        self.virtual_capacity = virtual_capacity
+        self.processing_times = by_packet_type(processing_times)
+        self.ttl_values = by_packet_type(ttl_values)
+        self.packet_types = [PACKET_TYPE_CODES[packet_type] for packet_type in packet_types]
+        self.rng = random.Random(seed)  # Same seed, same run on every machine
+        self.clock = SimulationClock()
+        self.events = EventQueue()
+        self.event_log = event_log
+        self.profiler = profiler  # A profiling.PhaseProfiler to time the loop's phases
+        self.preprocessors = [Preprocessor(device_capacity, virtual_capacity, 1)]
+        # Without the index, allocation falls back to the reference linear first-fit scan
+        self.allocation_index = AllocationIndex(self.preprocessors) if use_allocation_index else None
+        # First-fit keeps using the allocator's built-in index/scan, the other policies plug in through placement.py
+        self.placement_policy = None if placement == "first-fit" else make_placement_policy(
+            placement, self.allocation_index, seed)
+        self.flow_count = flow_count  # Number of synthetic flows packets are spread over; None for no flow IDs
+        self.dropped_packets = 0  # Trace packets the classifier dropped before allocation
+        self.metrics = FleetMetrics(PACKET_TYPES)
+        self.metrics.track(self.preprocessors[0])
+        self.snapshots = self.metrics.snapshots  # One row per simulated second
+        # With scale_in_cooldown=None the fleet only grows, as in the original model
+        self.autoscaler = Autoscaler(self.clock, self.preprocessors,
+                                     functools.partial(Preprocessor, device_capacity, virtual_capacity),
+                                     self.metrics, self.allocation_index, scale_in_cooldown, scale_in_utilization,
+                                     warm_pool_size, min_preprocessors, event_log)
+
+    def schedule_second(self, second, intensity):
+        # The second's intensity is split into virtual_capacity-sized packets spread evenly over that second
+        loads = []
+        while intensity > 0:
+            load = min(intensity, self.virtual_capacity)
+            loads.append(load)
+            intensity -= load
+        for position, load in enumerate(loads):
+            self.events.schedule(second - 1 + position / len(loads), ARRIVAL, load)
+
+    def run_until(self, timestamp):
+        profiler = self.profiler
+        departures = 0
+        while self.events and self.events.next_time() <= timestamp:
+            event_time, kind, payload, preprocessor = self.events.pop()
+            self.clock.advance_to(event_time)
+            if kind == ARRIVAL:
+                self.handle_arrival(payload)
+            else:
+                if profiler.enabled:
+                    started = time.perf_counter()
+                handle_packet_departure(kind, payload, preprocessor, self.clock, self.event_log)
+                if profiler.enabled:
+                    profiler.add_time("handle_packet_departure", started)
+                    departures += 1
+        if profiler.enabled:
+            # How many departures one pass handled: the successor of the old per-packet expiry sweep
+            profiler.observe("departure_sweep_length", departures)
+        self.clock.advance_to(timestamp)
+
+    def handle_arrival(self, load):
+        profiler = self.profiler
+        if profiler.enabled:
+            started = time.perf_counter()
+        packet = generate_packet(load, self.packet_types, self.ttl_values, self.clock, self.rng, self.flow_count)
+        if profiler.enabled:
+            profiler.add_time("generate_packet", started)
+        self.admit_packet(packet)
+
+    def admit_packet(self, packet):
+        profiler = self.profiler
+        if profiler.enabled:
+            fleet_size = len(self.preprocessors)
+            started = time.perf_counter()
+        preprocessor = allocate_packet_to_preprocessor(packet, self.preprocessors, self.device_capacity,
+                                                       self.virtual_capacity, self.allocation_index, self.event_log,
+                                                       self.metrics, self.autoscaler, self.placement_policy)
+        # Packets merged into an existing virtual thread leave together with that thread
+        if preprocessor.newest_thread is packet:
+            schedule_packet_departure(self.events, packet, preprocessor, self.processing_times, self.clock.now)
+        if profiler.enabled:
+            profiler.add_time("allocate_packet_to_preprocessor", started)
+            self.observe_allocation(preprocessor, fleet_size)
+
+    def observe_allocation(self, preprocessor, fleet_size):
+        # Scan length is how many preprocessors a linear first-fit scan examines for this packet, whichever
+        # allocator actually ran: every one of them when a new preprocessor had to be started
+        if len(self.preprocessors) > fleet_size:
+            self.profiler.observe("preprocessors_started")
+            self.profiler.observe("allocation_scan_length", fleet_size)
+        elif preprocessor.index_position is not None:
+            self.profiler.observe("allocation_scan_length", preprocessor.index_position + 1)
+        else:
+            self.profiler.observe("allocation_scan_length", self.preprocessors.index(preprocessor) + 1)
+
+    def record_second(self, second):
+        snapshot = self.metrics.snapshot(second)
+        snapshot.update(self.autoscaler.report())
+        snapshot["dropped"] = self.dropped_packets
+        return snapshot
+
+    def preprocessor_rows(self):
+        # Every instance ever started, including those parked in the warm pool or terminated by scale-in
+        every_preprocessor = self.preprocessors + self.autoscaler.warm_pool + self.autoscaler.terminated
+        return preprocessor_rows(sorted(every_preprocessor, key=lambda p: p.preprocessor_id))
+
+    def finish_second(self, second):
+        self.run_until(second)
+        profiler = self.profiler
+        if profiler.enabled:
+            started = time.perf_counter()
+        self.autoscaler.scale_in()
+        if profiler.enabled:
+            profiler.add_time("scale_in", started)
+            started = time.perf_counter()
+        snapshot = self.record_second(second)
+        if profiler.enabled:
+            profiler.add_time("record_second", started)
+        if self.event_log.info:
+            self.event_log.emit(INFO, "second-complete", second,
+                                physical_preprocessors=snapshot["physical_preprocessors"],
+                                virtual_preprocessors=snapshot["virtual_preprocessors"])
+
+    def run(self, intensities):
+        for second, intensity in enumerate(intensities, 1):
+            self.schedule_second(second, intensity)
+            self.finish_second(second)
+        return self.preprocessors
+
+    def run_trace(self, trace_packets, classify=None, load=1):
+        # Replays recorded packets (trace_replay.TracePacket, in timestamp order) instead of an intensity curve.
+        # The trace's first packet is simulated time 0 and every packet carries `load`, so virtual_capacity counts
+        # packets. classify(packet) picks the packet type, e.g. DAWN_SDN_Defense.packet_type, and returns None
+        # to drop the packet; without it types come from the configured mix. Flows are keyed by source address.
+        profiler = self.profiler
+        second = 1
+        first_timestamp = None
+        for trace_packet in trace_packets:
+            if first_timestamp is None:
+                first_timestamp = trace_packet.timestamp
+            timestamp = trace_packet.timestamp - first_timestamp
+            while timestamp >= second:
+                self.finish_second(second)
+                second += 1
+            self.run_until(timestamp)
+            if classify is None:
+                packet_type = self.rng.choice(self.packet_types)
+            elif profiler.enabled:
+                started = time.perf_counter()
+                packet_type = classify(trace_packet)
+                profiler.add_time("classify", started)
+            else:
+                packet_type = classify(trace_packet)
+            if packet_type is None:
+                self.dropped_packets += 1
+                continue
+            self.admit_packet(Packet(load, timestamp, packet_type, self.ttl_values[packet_type], trace_packet.src_ip))
+        self.finish_second(second)
+        return self.preprocessors
+
+
+def preprocessor_rows(preprocessors):
+    # Final per-preprocessor state, in the same layout as the exported preprocessors.csv
+    return [
+        {"preprocessor": f"P{p.preprocessor_id}", "times_reused": p.times_reused,
+         **dict(zip(PACKET_TYPES, p.type_counts)), "expired": p.total_expired_packets,
+         "virtual_preprocessors": p.thread_count, "utilization": p.current_load / p.device_capacity * 100}
+        for p in preprocessors
+    ]
+
+
+def plot_packet_distribution(preprocessor_rows, output_path):
+    labels = [row["preprocessor"] for row in preprocessor_rows]
+    unchecked = [int(row["unchecked"]) for row in preprocessor_rows]
+    whitelisted = [int(row["whitelisted"]) for row in preprocessor_rows]
+    blacklisted = [int(row["blacklisted"]) for row in preprocessor_rows]
+    signature_based = [int(row["signature-based"]) for row in preprocessor_rows]
 
     x = range(len(labels))
     width = 0.2
@@ -112,67 +454,70 @@ def plot_packet_distribution(preprocessors):
     ax.set_xticklabels(labels)
     ax.legend()
 
-    plt.show()
-
-def plot_virtual_preprocessors(preprocessors):
-    labels = [f"P{idx+1}" for idx in range(len(preprocessors))]
-    virtuals = [len(p.threads) for p in preprocessors]
-
-    plt.bar(labels, virtuals, color='blue')
-    plt.xlabel('Preprocessor ID')
-    plt.ylabel('Number of Virtual Preprocessors')
-    plt.title('Virtual Preprocessors per Physical Preprocessor')
-    plt.show()
-
-def plot_utilization(preprocessors):
-    labels = [f"P{idx+1}" for idx in range(len(preprocessors))]
-    utilization = [(p.current_load / p.device_capacity) * 100 for p in preprocessors]
-
-    plt.bar(labels, utilization, color='green')
-    plt.xlabel('Preprocessor ID')
-    plt.ylabel('Utilization (%)')
-    plt.title('Utilization of Physical Preprocessors')
-    plt.ylim(0, 100)
-    plt.show()
-
-def plot_times_reused(preprocessors):
-    labels = [f"P{idx+1}" for idx in range(len(preprocessors))]
-    times_reused = [p.times_reused for p in preprocessors]
-
-    plt.bar(labels, times_reused, color='red')
-    plt.xlabel('Preprocessor ID')
-    plt.ylabel('Times Reused')
-    plt.title('Times Reused for Each Preprocessor')
-    plt.show()
-
-def plot_ttl_expiry(preprocessors):
-    labels = [f"P{idx+1}" for idx in range(len(preprocessors))]
-    expired = [p.total_expired_packets for p in preprocessors]
-
-    plt.bar(labels, expired, color='purple')
-    plt.xlabel('Preprocessor ID')
-    plt.ylabel('Number of Packets Expired')
-    plt.title('Packet TTL Expiry per Preprocessor')
-    plt.show()
-
-def display_summary_table(preprocessors):
+    save_figure(fig, output_path)
+
+def plot_virtual_preprocessors(preprocessor_rows, output_path):
+    labels = [row["preprocessor"] for row in preprocessor_rows]
+    virtuals = [int(row["virtual_preprocessors"]) for row in preprocessor_rows]
+
+    fig, ax = plt.subplots()
+    ax.bar(labels, virtuals, color='blue')
+    ax.set_xlabel('Preprocessor ID')
+    ax.set_ylabel('Number of Virtual Preprocessors')
+    ax.set_title('Virtual Preprocessors per Physical Preprocessor')
+    save_figure(fig, output_path)
+
+def plot_utilization(preprocessor_rows, output_path):
+    labels = [row["preprocessor"] for row in preprocessor_rows]
+    utilization = [float(row["utilization"]) for row in preprocessor_rows]
+
+    fig, ax = plt.subplots()
+    ax.bar(labels, utilization, color='green')
+    ax.set_xlabel('Preprocessor ID')
+    ax.set_ylabel('Utilization (%)')
+    ax.set_title('Utilization of Physical Preprocessors')
+    ax.set_ylim(0, 100)
+    save_figure(fig, output_path)
+
+def plot_times_reused(preprocessor_rows, output_path):
+    labels = [row["preprocessor"] for row in preprocessor_rows]
+    times_reused = [int(row["times_reused"]) for row in preprocessor_rows]
+
+    fig, ax = plt.subplots()
+    ax.bar(labels, times_reused, color='red')
+    ax.set_xlabel('Preprocessor ID')
+    ax.set_ylabel('Times Reused')
+    ax.set_title('Times Reused for Each Preprocessor')
+    save_figure(fig, output_path)
+
+def plot_ttl_expiry(preprocessor_rows, output_path):
+    labels = [row["preprocessor"] for row in preprocessor_rows]
+    expired = [int(row["expired"]) for row in preprocessor_rows]
+
+    fig, ax = plt.subplots()
+    ax.bar(labels, expired, color='purple')
+    ax.set_xlabel('Preprocessor ID')
+    ax.set_ylabel('Number of Packets Expired')
+    ax.set_title('Packet TTL Expiry per Preprocessor')
+    save_figure(fig, output_path)
+
+def display_summary_table(preprocessor_rows, output_path):
     # Create a new figure
-    fig, ax = plt.subplots(figsize=(12, len(preprocessors) * 0.5))  # Adjust the size based on the number of preprocessors
+    fig, ax = plt.subplots(figsize=(12, max(len(preprocessor_rows) * 0.5, 2)))  # Adjust the size based on the number of preprocessors
     ax.axis('off')  # Turn off the axis
 
     # Data for the table
     columns = ["Physical Preprocessor", "Times Reused", "Unchecked", "Whitelisted", "Blacklisted", "Signature"]
     cell_data = []
-    for idx, preprocessor in enumerate(preprocessors, 1):
-        row = [
-            "P" + str(idx),
-            preprocessor.times_reused,
-            preprocessor.total_unchecked_packets,
-            preprocessor.total_whitelisted_packets,
-            preprocessor.total_blacklisted_packets,
-            preprocessor.total_signature_packets
-        ]
-        cell_data.append(row)
+    for row in preprocessor_rows:
+        cell_data.append([
+            row["preprocessor"],
+            row["times_reused"],
+            row["unchecked"],
+            row["whitelisted"],
+            row["blacklisted"],
+            row["signature-based"]
+        ])
 
     # Create the table
     table = ax.table(cellText=cell_data, colLabels=columns, cellLoc='center', loc='center')
@@ -181,22 +526,61 @@ def display_summary_table(preprocessors):
     table.auto_set_column_width(col=list(range(len(columns))))
 
     # Adjust the table properties for better aesthetics
-    table.auto_set_font_size(False)
-    table.set_fontsize(10)
     table.scale(1, 1.5)
 
-    plt.title("Summary Table")
-    plt.show()
+    ax.set_title("Summary Table")
+    save_figure(fig, output_path)
 
-def plot_processing_time(avg_processing_times):
+def plot_processing_time(avg_processing_times, output_path):
     labels = list(avg_processing_times.keys())
     times = [time_val / 1000 for time_val in avg_processing_times.values()]  # Convert to milliseconds
 
-    plt.bar(labels, times, color='orange')
-    plt.xlabel('Packet Type')
-    plt.ylabel('Average Processing Time (ms)')  # Adjust the label to ms
-    plt.title('Average Processing Time per Packet Type')
-    plt.show()
+    fig, ax = plt.subplots()
+    ax.bar(labels, times, color='orange')
+    ax.set_xlabel('Packet Type')
+    ax.set_ylabel('Average Processing Time (ms)')  # Adjust the label to ms
+    ax.set_title('Average Processing Time per Packet Type')
+    save_figure(fig, output_path)
+
+def plot_time_series(per_second_rows, column, ylabel, title, output_path, color, ylim=None):
+    time_points = [int(row["second"]) for row in per_second_rows]
+    values = [float(row[column]) for row in per_second_rows]
+
+    fig, ax = plt.subplots(figsize=(10, 5))
+    ax.plot(time_points, values, '-o', color=color)
+    ax.set_xlabel('Time (seconds)')
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.grid(True)
+    if ylim is not None:
+        ax.set_ylim(*ylim)
+    save_figure(fig, output_path)
+
+def save_figure(fig, output_path):
+    fig.savefig(output_path, bbox_inches='tight')
+    plt.close(fig)
+
+def render_plots(per_second_path, preprocessors_path, output_dir):
+    # Renders every chart from the exported CSV files, never from live simulation state
+    per_second_rows = read_csv(per_second_path)
+    preprocessor_rows = read_csv(preprocessors_path)
+    os.makedirs(output_dir, exist_ok=True)
+
+    def output(name):
+        return os.path.join(output_dir, name)
+
+    plot_time_series(per_second_rows, "physical_preprocessors", 'Number of Active Preprocessors',
+                     'Active Preprocessors Over Time', output("active_preprocessors.png"), 'blue')
+    plot_time_series(per_second_rows, "virtual_preprocessors", 'Number of Active Virtual Preprocessors',
+                     'Active Virtual Preprocessors Over Time', output("active_virtual_preprocessors.png"), 'green')
+    plot_time_series(per_second_rows, "average_utilization", 'Average Utilization (%)',
+                     'Average Utilization Over Time', output("average_utilization.png"), 'green', ylim=(0, 300))
+    plot_packet_distribution(preprocessor_rows, output("packet_distribution.png"))
+    plot_virtual_preprocessors(preprocessor_rows, output("virtual_preprocessors.png"))
+    plot_utilization(preprocessor_rows, output("utilization.png"))
+    plot_times_reused(preprocessor_rows, output("times_reused.png"))
+    plot_ttl_expiry(preprocessor_rows, output("ttl_expiry.png"))
+    display_summary_table(preprocessor_rows, output("summary_table.png"))
 
 
 def generate_intensities():
@@ -217,6 +601,13 @@ def generate_intensities():
 
     return intensities
 
+def build_packet_types(packet_distribution):
+    # One entry per percentage point, so random.choice picks types in the configured proportions
+    packet_types = []
+    for packet_type, percentage in packet_distribution.items():
+        packet_types.extend([packet_type] * percentage)
+    return packet_types
+
 def input_intensities_manually(duration):
     intensities = []
     for i in range(1, duration + 1):
@@ -273,119 +664,46 @@ def simulate_attack():
         remaining_percentage -= packet_distribution["blacklisted"]
 
     packet_distribution["signature-based"] = remaining_percentage
-    packet_types = []
-    for packet_type, percentage in packet_distribution.items():
-        packet_types.extend([packet_type] * percentage)
-
-    preprocessors = [Preprocessor(device_capacity, virtual_capacity)]
-
-    time_points = []
-    active_preprocessors_data = []  # For physical preprocessors
-    virtual_preprocessors_data = []  # For virtual preprocessors
-
-    # Collecting utilization data for each preprocessor
-    utilization_data = []
-
-    # for i in range(1, duration + 1):
-    #     intensity = int(input(f"Enter the attack intensity for second {i}: "))
-    #     intensities.append(intensity)
-
-    for i in range(1, duration + 1):
-        intensity = intensities[i - 1]
-
-        for preprocessor in preprocessors:
-            while intensity > 0:
-                load = min(intensity, virtual_capacity)
-                packet = generate_packet(load, packet_types, ttl_values)
-                allocate_packet_to_preprocessor(packet, preprocessors, device_capacity, virtual_capacity,processing_times)
-                intensity -= load
-                print(
-                    f"Second {i}\nVirtual Preprocessors in Preprocessor {len(preprocessors)}: {len(preprocessors[-1].threads)}")
-        # Append data for plotting
-        time_points.append(i)
-        active_preprocessors_data.append(len(preprocessors))
-        virtual_preprocessors_data.append(sum(len(p.threads) for p in preprocessors))
-        current_utilization = [p.current_load / p.device_capacity * 100 for p in preprocessors]
-        utilization_data.append(sum(current_utilization) / len(current_utilization))  # Average utilization
-
-        # If there's remaining intensity, initialize a new preprocessor
-        if intensity > 0:
-            new_preprocessor = Preprocessor(device_capacity, virtual_capacity)
-            load = min(intensity, virtual_capacity)
-            packet = generate_packet(load, packet_types, ttl_values)
-            new_preprocessor.add_packet(packet)
-            preprocessors.append(new_preprocessor)
-            print(
-                f"Second {i}\nNew Preprocessor {len(preprocessors)} initialized with load: {load}/{new_preprocessor.device_capacity}")
-            print(f"Virtual Preprocessors: {len(new_preprocessor.threads)}")
-
-    print(f"\nTotal Physical Preprocessors: {len(preprocessors)}")
-    print(f"Total Virtual Preprocessors: {sum(len(p.threads) for p in preprocessors)}")
-
+    packet_types = build_packet_types(packet_distribution)
+
+    # Progress goes to a JSON-lines file rather than the terminal; use level=DEBUG to also record every packet
+    with EventLog("simulation_events.jsonl", level=INFO) as event_log:
+        simulation = AttackSimulation(device_capacity, virtual_capacity, processing_times, ttl_values, packet_types,
+                                      event_log=event_log)
+        simulation.run(intensities)
+    print("Simulation events written to simulation_events.jsonl")
+
+    print(f"\nTotal Physical Preprocessors: {simulation.metrics.preprocessor_count}")
+    print(f"Total Virtual Preprocessors: {simulation.metrics.thread_count}")
+
+    # Export the per-second series and the final per-preprocessor table; the plots are rendered from these files
+    output_dir = "simulation_output"
+    os.makedirs(output_dir, exist_ok=True)
+    per_second_path = os.path.join(output_dir, "per_second.csv")
+    preprocessors_path = os.path.join(output_dir, "preprocessors.csv")
+    simulation.metrics.export_csv(per_second_path)
+    rows = simulation.preprocessor_rows()
+    write_csv(preprocessors_path, rows)
 
     # Display the summary table
     print("\n---------------------------------------------------------------------------------------------")
     print("| Physical Preprocessor | Times Reused | Unchecked | Whitelisted | Blacklisted | Signature |")
     print("----------------------------------------------------------------------------------------------")
-    for idx, preprocessor in enumerate(preprocessors, 1):
-        print("|", "P" + str(idx), " " * (20 - len(str(idx))), "|",
-              preprocessor.times_reused, " " * (11 - len(str(preprocessor.times_reused))), "|",
-              preprocessor.total_unchecked_packets, " " * (8 - len(str(preprocessor.total_unchecked_packets))), "|",
-              preprocessor.total_whitelisted_packets, " " * (10 - len(str(preprocessor.total_whitelisted_packets))),
+    for row in rows:
+        print("|", row["preprocessor"], " " * (21 - len(row["preprocessor"])), "|",
+              row["times_reused"], " " * (11 - len(str(row["times_reused"]))), "|",
+              row["unchecked"], " " * (8 - len(str(row["unchecked"]))), "|",
+              row["whitelisted"], " " * (10 - len(str(row["whitelisted"]))),
               "|",
-              preprocessor.total_blacklisted_packets, " " * (10 - len(str(preprocessor.total_blacklisted_packets))),
+              row["blacklisted"], " " * (10 - len(str(row["blacklisted"]))),
               "|",
-              preprocessor.total_signature_packets, " " * (8 - len(str(preprocessor.total_signature_packets))), "|")
+              row["signature-based"], " " * (8 - len(str(row["signature-based"]))), "|")
         print("----------------------------------------------------------------------------------------------")
 
-        # Plotting the data
-    # plt.plot(time_points, active_preprocessors_data, '-o', color='blue')
-    # plt.xlabel('Time (seconds)')
-    # plt.ylabel('Number of Active Preprocessors')
-    # plt.title('Active Preprocessors Over Time')
-    # plt.grid(True)
-    # plt.show()
-
-
-    # Plotting the number of active preprocessors over time
-    plt.figure(figsize=(10, 5))
-    plt.plot(time_points, active_preprocessors_data, '-o', color='blue')
-    plt.xlabel('Time (seconds)')
-    plt.ylabel('Number of Active Preprocessors')
-    plt.title('Active Preprocessors Over Time')
-    plt.grid(True)
-    plt.show()
-
-    # Plotting the number of active virtual preprocessors over time
-    plt.figure(figsize=(10, 5))
-    plt.plot(time_points, virtual_preprocessors_data, '-o', color='green', label='Virtual Preprocessors')
-    plt.xlabel('Time (seconds)')
-    plt.ylabel('Number of Active Virtual Preprocessors')
-    plt.title('Active Virtual Preprocessors Over Time')
-    plt.grid(True)
-    plt.legend()
-    plt.show()
-
-
-    # Plotting the average utilization over time
-    plt.figure(figsize=(10, 5))
-    plt.plot(time_points, utilization_data, '-o', color='green')
-    plt.xlabel('Time (seconds)')
-    plt.ylabel('Average Utilization (%)')
-    plt.title('Average Utilization Over Time')
-    plt.grid(True)
-    plt.ylim(0, 300)  # Setting y-axis limits to for percentage
-    plt.show()
-
     # Plotting the graphs
-    plot_packet_distribution(preprocessors)
-    plot_virtual_preprocessors(preprocessors)
-    plot_utilization(preprocessors)
-    plot_times_reused(preprocessors)
-    plot_ttl_expiry(preprocessors)
-    display_summary_table(preprocessors)
-
-
-simulate_attack()
+    render_plots(per_second_path, preprocessors_path, output_dir)
+    print(f"\nResults and plots written to {output_dir}/")
 
 
+if __name__ == "__main__":
+    simulate_attack()
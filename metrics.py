@@ -0,0 +1,78 @@
+import csv
+
+
+class FleetMetrics:
+    # Fleet-wide aggregates kept current by Preprocessor.add_packet/remove_packet, so a per-second snapshot
+    # costs O(1) instead of a walk over every preprocessor
+    def __init__(self, type_names):
+        self.type_names = type_names
+        self.preprocessor_count = 0
+        self.total_capacity = 0
+        self.total_load = 0
+        self.thread_count = 0
+        self.type_counts = [0] * len(type_names)
+        self.expired_packets = 0
+        self.snapshots = []
+
+    def track(self, preprocessor):
+        # Counts whatever the preprocessor already holds, then follows its updates
+        preprocessor.metrics = self
+        self.preprocessor_count += 1
+        self.total_capacity += preprocessor.device_capacity
+        self.total_load += preprocessor.current_load
+        self.thread_count += preprocessor.thread_count
+        for packet_type, count in enumerate(preprocessor.type_counts):
+            self.type_counts[packet_type] += count
+        self.expired_packets += preprocessor.total_expired_packets
+
+    def release(self, preprocessor):
+        # A drained preprocessor leaves the active fleet; the packets it handled stay in the totals
+        self.preprocessor_count -= 1
+        self.total_capacity -= preprocessor.device_capacity
+
+    def resume(self, preprocessor):
+        self.preprocessor_count += 1
+        self.total_capacity += preprocessor.device_capacity
+
+    def packet_added(self, packet, opened_thread):
+        self.total_load += packet.load
+        self.thread_count += opened_thread
+        self.type_counts[packet.packet_type] += 1
+
+    def packet_removed(self, packet):
+        self.total_load -= packet.load
+        self.thread_count -= 1
+
+    def packet_expired(self):
+        self.expired_packets += 1
+
+    def average_utilization(self):
+        # Every preprocessor in a fleet has the same capacity, so this is the mean per-preprocessor utilization
+        return self.total_load / self.total_capacity * 100 if self.total_capacity else 0.0
+
+    def snapshot(self, second):
+        row = {
+            "second": second,
+            "physical_preprocessors": self.preprocessor_count,
+            "virtual_preprocessors": self.thread_count,
+            "average_utilization": self.average_utilization(),
+            "total_load": self.total_load,
+            "expired": self.expired_packets,
+        }
+        row.update(zip(self.type_names, self.type_counts))
+        self.snapshots.append(row)
+        return row
+
+    def export_csv(self, path):
+        write_csv(path, self.snapshots)
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="") as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+def read_csv(path):
+    with open(path, newline="") as csv_file:
+        return list(csv.DictReader(csv_file))
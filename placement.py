@@ -0,0 +1,121 @@
+import random
+import zlib
+
+from allocation_index import free_room
+
+
+# Placement policies pick the preprocessor a packet goes to, or return None to have the allocator start
+# (or bring back) a new one. A preprocessor "fits" exactly when the first-fit allocator would accept the packet.
+
+def first_fit_scan(packet, preprocessors):
+    for preprocessor in preprocessors:
+        if free_room(preprocessor) >= packet.load:
+            return preprocessor
+    return None
+
+
+class FirstFit:
+    # ALLOCATEPACKETTOPREPROCESSOR from the pseudo code: the first preprocessor in fleet order that fits
+    name = "first-fit"
+
+    def __init__(self, allocation_index=None):
+        self.allocation_index = allocation_index
+
+    def choose(self, packet, preprocessors):
+        if self.allocation_index is not None:
+            return self.allocation_index.first_fit(packet.load)
+        return first_fit_scan(packet, preprocessors)
+
+
+class BestFit:
+    # The preprocessor left with the least free room, which packs the fleet tightly at O(P) per packet.
+    # The index cannot find the tightest fit, but its maximum skips the scan when nothing fits.
+    name = "best-fit"
+
+    def __init__(self, allocation_index=None):
+        self.allocation_index = allocation_index
+
+    def choose(self, packet, preprocessors):
+        if self.allocation_index is not None:
+            roomiest = self.allocation_index.largest_room()
+            if roomiest is None or free_room(roomiest) < packet.load:
+                return None
+        best, best_room = None, None
+        for preprocessor in preprocessors:
+            room = free_room(preprocessor)
+            if room >= packet.load and (best_room is None or room < best_room):
+                best, best_room = preprocessor, room
+        return best
+
+
+class WorstFit:
+    # The preprocessor with the most free room, which spreads load evenly across the fleet
+    name = "worst-fit"
+
+    def __init__(self, allocation_index=None):
+        self.allocation_index = allocation_index
+
+    def choose(self, packet, preprocessors):
+        if self.allocation_index is not None:
+            preprocessor = self.allocation_index.largest_room()
+            return preprocessor if preprocessor is not None and free_room(preprocessor) >= packet.load else None
+        worst, worst_room = None, None
+        for preprocessor in preprocessors:
+            room = free_room(preprocessor)
+            if room >= packet.load and (worst_room is None or room > worst_room):
+                worst, worst_room = preprocessor, room
+        return worst
+
+
+class PowerOfTwoChoices:
+    # Samples two preprocessors and keeps the emptier one that fits, at O(1) per packet.
+    # When neither sample fits it falls back to first-fit instead of growing the fleet.
+    name = "power-of-two-choices"
+
+    def __init__(self, allocation_index=None, seed=None):
+        self.fallback = FirstFit(allocation_index)
+        self.rng = random.Random(seed)  # Separate from the simulation's generator, so every policy sees the same packets
+
+    def choose(self, packet, preprocessors):
+        first = preprocessors[self.rng.randrange(len(preprocessors))]
+        second = preprocessors[self.rng.randrange(len(preprocessors))]
+        first_room, second_room = free_room(first), free_room(second)
+        if second_room > first_room:
+            first, first_room = second, second_room
+        if first_room >= packet.load:
+            return first
+        return self.fallback.choose(packet, preprocessors)
+
+
+class FlowAffinity:
+    # Hashes a packet's flow (its flow_id, or its packet type when it has none) to a preferred preprocessor so a
+    # flow's packets land together. Probes a few neighbours when the preferred one is full, then falls back to first-fit.
+    name = "flow-affinity"
+
+    def __init__(self, allocation_index=None, probes=4):
+        self.fallback = FirstFit(allocation_index)
+        self.probes = probes
+
+    def flow_hash(self, packet):
+        flow = packet.flow_id if packet.flow_id is not None else packet.packet_type
+        # crc32 rather than hash(), so placements do not change with PYTHONHASHSEED
+        return zlib.crc32(str(flow).encode())
+
+    def choose(self, packet, preprocessors):
+        start = self.flow_hash(packet) % len(preprocessors)
+        for offset in range(min(self.probes, len(preprocessors))):
+            preprocessor = preprocessors[(start + offset) % len(preprocessors)]
+            if free_room(preprocessor) >= packet.load:
+                return preprocessor
+        return self.fallback.choose(packet, preprocessors)
+
+
+PLACEMENT_POLICIES = {policy.name: policy for policy in (FirstFit, BestFit, WorstFit, PowerOfTwoChoices, FlowAffinity)}
+
+
+def make_placement_policy(name, allocation_index=None, seed=None):
+    if name not in PLACEMENT_POLICIES:
+        raise ValueError(f"Unknown placement policy: {name}")
+    if name == PowerOfTwoChoices.name:
+        return PowerOfTwoChoices(allocation_index, seed)
+    return PLACEMENT_POLICIES[name](allocation_index)
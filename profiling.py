@@ -0,0 +1,38 @@
+import time
+from collections import defaultdict
+
+
+class PhaseProfiler:
+    # Wall time per phase of the simulation loop, plus value counters such as allocation scan lengths.
+    # Like the event log, call sites check `enabled` before timing anything, so a disabled profiler costs one
+    # attribute lookup per call site.
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.phase_seconds = defaultdict(float)
+        self.phase_calls = defaultdict(int)
+        self.counter_totals = defaultdict(int)
+        self.counter_samples = defaultdict(int)
+        self.counter_maxima = {}
+
+    def add_time(self, phase, started):
+        # `started` is the time.perf_counter() reading taken when the phase began
+        self.phase_seconds[phase] += time.perf_counter() - started
+        self.phase_calls[phase] += 1
+
+    def observe(self, counter, value=1):
+        self.counter_totals[counter] += value
+        self.counter_samples[counter] += 1
+        if value > self.counter_maxima.get(counter, value - 1):
+            self.counter_maxima[counter] = value
+
+    def report(self):
+        phases = {phase: {"seconds": seconds, "calls": self.phase_calls[phase],
+                          "us_per_call": seconds / self.phase_calls[phase] * 1e6}
+                  for phase, seconds in self.phase_seconds.items()}
+        counters = {counter: {"total": total, "samples": self.counter_samples[counter],
+                              "mean": total / self.counter_samples[counter], "max": self.counter_maxima[counter]}
+                    for counter, total in self.counter_totals.items()}
+        return {"phases": phases, "counters": counters}
+
+
+DISABLED_PROFILER = PhaseProfiler(enabled=False)
@@ -0,0 +1,38 @@
+from collections import OrderedDict
+
+
+class SourceRateLimiter:
+    # Per-source token buckets: every source may send `rate` packets per simulated second, with bursts of up to
+    # `burst`. Buckets live in an LRU table capped at max_sources entries, so memory stays fixed however many
+    # distinct (or spoofed) sources appear; a source evicted from the table comes back with a full bucket.
+    # Time is read from the simulation clock, so the limiter replays identically at any speed.
+    def __init__(self, clock, rate, burst=None, max_sources=100_000):
+        self.clock = clock
+        self.rate = rate
+        self.burst = burst if burst is not None else rate
+        self.max_sources = max_sources
+        self.buckets = OrderedDict()  # Source -> [tokens, time of the last refill], least recently seen first
+        self.limited_packets = 0
+        self.evicted_sources = 0
+
+    def allow(self, source):
+        now = self.clock.now
+        bucket = self.buckets.get(source)
+        if bucket is None:
+            if len(self.buckets) >= self.max_sources:
+                self.buckets.popitem(last=False)
+                self.evicted_sources += 1
+            self.buckets[source] = [self.burst - 1, now]
+            return True
+        self.buckets.move_to_end(source)
+        tokens = min(bucket[0] + (now - bucket[1]) * self.rate, self.burst)
+        bucket[1] = now
+        if tokens >= 1:
+            bucket[0] = tokens - 1
+            return True
+        bucket[0] = tokens
+        self.limited_packets += 1
+        return False
+
+    def __len__(self):
+        return len(self.buckets)
@@ -0,0 +1,170 @@
+from array import array
+from collections import deque
+
+
+def as_signature(signature):
+    if isinstance(signature, str):
+        signature = signature.encode()
+    signature = bytes(signature)
+    if not signature:
+        raise ValueError("Signatures must not be empty")
+    return signature
+
+def as_byte_view(payload):
+    # Matching walks the payload's bytes in place; only str payloads are encoded (and so copied)
+    if isinstance(payload, str):
+        return payload.encode()
+    if isinstance(payload, memoryview) and payload.format != "B":
+        return payload.cast("B")
+    return payload
+
+
+class AhoCorasick:
+    # Immutable Aho-Corasick automaton over bytes, compiled into a dense transition table so matching costs one
+    # table lookup per payload byte and never follows failure links. Bytes that appear in no signature share one
+    # column of the table. Entries are row offsets (state * width) rather than state numbers, and states with
+    # output are numbered last, so "did a signature end here" is a single comparison.
+    def __init__(self, signatures):
+        signatures = list(dict.fromkeys(as_signature(signature) for signature in signatures))
+        self.signatures = signatures
+
+        # Trie, with state 0 as the root
+        goto = [{}]
+        outputs = [[]]
+        for signature in signatures:
+            state = 0
+            for byte in signature:
+                next_state = goto[state].get(byte)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][byte] = next_state
+                    goto.append({})
+                    outputs.append([])
+                state = next_state
+            outputs[state].append(signature)
+
+        alphabet = sorted({byte for signature in signatures for byte in signature})
+        # Byte -> column; every byte outside the alphabet shares the last column, which always leads back to the root
+        width = min(len(alphabet) + 1, 256)
+        classes = bytearray([width - 1]) * 256
+        for column, byte in enumerate(alphabet):
+            classes[byte] = column
+
+        # Breadth-first: failure links, merged outputs and the complete transition rows
+        rows = [None] * len(goto)
+        fail = [0] * len(goto)
+        rows[0] = [0] * width
+        for byte, child in goto[0].items():
+            rows[0][classes[byte]] = child
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            fallback = rows[fail[state]]
+            row = list(fallback)
+            for byte, child in goto[state].items():
+                row[classes[byte]] = child
+                fail[child] = fallback[classes[byte]]
+                queue.append(child)
+            rows[state] = row
+            outputs[state] = outputs[state] + outputs[fail[state]]
+
+        # Renumber so that states with output come last
+        order = [state for state in range(len(goto)) if not outputs[state]]
+        self.accepting_from = len(order) * width
+        order += [state for state in range(len(goto)) if outputs[state]]
+        offsets = [0] * len(goto)
+        for position, state in enumerate(order):
+            offsets[state] = position * width
+        self.table = array("I", (offsets[target] for state in order for target in rows[state]))
+        self.outputs = [outputs[state] for state in order]
+        self.classes = bytes(classes)
+        self.width = width
+
+    def first_match(self, payload):
+        # The first signature to end in the payload, or None
+        table, classes, accepting_from = self.table, self.classes, self.accepting_from
+        state = 0
+        for byte in as_byte_view(payload):
+            state = table[state + classes[byte]]
+            if state >= accepting_from:
+                return self.outputs[state // self.width][0]
+        return None
+
+    def find_all(self, payload):
+        # Every occurrence, overlapping ones included, as (end offset, signature) pairs
+        table, classes, accepting_from = self.table, self.classes, self.accepting_from
+        matches = []
+        state = 0
+        for end, byte in enumerate(as_byte_view(payload), 1):
+            state = table[state + classes[byte]]
+            if state >= accepting_from:
+                matches.extend((end, signature) for signature in self.outputs[state // self.width])
+        return matches
+
+    def __len__(self):
+        return len(self.signatures)
+
+
+class LayeredMatcher:
+    # Read-only view over several automata, matched one after another
+    def __init__(self, layers):
+        self.layers = layers
+        self.signatures = [signature for layer in layers for signature in layer.signatures]
+
+    def first_match(self, payload):
+        payload = as_byte_view(payload)
+        for layer in self.layers:
+            signature = layer.first_match(payload)
+            if signature is not None:
+                return signature
+        return None
+
+    def find_all(self, payload):
+        payload = as_byte_view(payload)
+        return sorted(match for layer in self.layers for match in layer.find_all(payload))
+
+    def __len__(self):
+        return len(self.signatures)
+
+
+class SignatureSet:
+    # The SDN's mutable signature list. compiled() returns a read-only matcher that preprocessors share; it is
+    # replaced, never modified, when signatures are added. New signatures are compiled into a small second
+    # automaton on their own, so adding a few costs a rebuild of just those. Once they are more than
+    # merge_fraction of the set, everything is compiled back into one automaton, so a payload is scanned once.
+    def __init__(self, signatures=(), merge_fraction=0.1):
+        self.merge_fraction = merge_fraction
+        self.signatures = []
+        self.known = set()
+        self.base = AhoCorasick(())
+        self.current = self.base
+        self.update(signatures)
+
+    def add(self, signature):
+        self.update([signature])
+
+    def update(self, signatures):
+        added = False
+        for signature in map(as_signature, signatures):
+            if signature not in self.known:
+                self.known.add(signature)
+                self.signatures.append(signature)
+                added = True
+        if added:
+            self.current = None
+
+    def compiled(self):
+        if self.current is None:
+            recent = self.signatures[len(self.base):]
+            if len(recent) > self.merge_fraction * len(self.signatures):
+                self.base = AhoCorasick(self.signatures)
+                self.current = self.base
+            else:
+                self.current = LayeredMatcher([self.base, AhoCorasick(recent)])
+        return self.current
+
+    def __contains__(self, signature):
+        return as_signature(signature) in self.known
+
+    def __len__(self):
+        return len(self.signatures)
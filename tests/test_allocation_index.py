@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from allocation_index import AllocationIndex, free_room
+from main import AttackSimulation, Packet, PacketType, Preprocessor, build_packet_types, generate_intensities
+from placement import PLACEMENT_POLICIES, first_fit_scan
+
+PROCESSING_TIMES = {"unchecked": 1000000, "whitelisted": 1500000, "blacklisted": 2000000, "signature-based": 2500000}
+TTL_VALUES = {"unchecked": -1, "whitelisted": 1200000, "blacklisted": -1, "signature-based": -1}
+PACKET_DISTRIBUTION = {"unchecked": 25, "whitelisted": 25, "blacklisted": 25, "signature-based": 25}
+
+
+def random_fleet(rng, size, device_capacity=1000, virtual_capacity=100):
+    preprocessors = [Preprocessor(device_capacity, virtual_capacity, position + 1) for position in range(size)]
+    index = AllocationIndex(preprocessors)
+    threads = {preprocessor: [] for preprocessor in preprocessors}
+    for _ in range(size * 8):
+        preprocessor = rng.choice(preprocessors)
+        packet = Packet(rng.randint(1, virtual_capacity), 0, PacketType.UNCHECKED)
+        if free_room(preprocessor) >= packet.load:
+            preprocessor.add_packet(packet)
+            if preprocessor.newest_thread is packet:
+                threads[preprocessor].append(packet)
+        if threads[preprocessor] and rng.random() < 0.3:
+            preprocessor.remove_packet(threads[preprocessor].pop(rng.randrange(len(threads[preprocessor]))))
+    return preprocessors, index
+
+
+@pytest.mark.parametrize("size", [1, 2, 5, 16, 33])
+def test_first_fit_matches_linear_scan(size):
+    rng = random.Random(size)
+    preprocessors, index = random_fleet(rng, size)
+    for load in range(0, 1002, 7):
+        packet = Packet(load, 0, PacketType.UNCHECKED)
+        assert index.first_fit(load) is first_fit_scan(packet, preprocessors)
+
+
+def test_largest_room_is_leftmost_maximum():
+    rng = random.Random(0)
+    for size in (1, 3, 8, 21):
+        preprocessors, index = random_fleet(rng, size)
+        rooms = [free_room(preprocessor) for preprocessor in preprocessors]
+        assert index.largest_room() is preprocessors[rooms.index(max(rooms))]
+
+
+def test_track_grows_the_tree():
+    preprocessors = [Preprocessor(1000, 100, 1)]
+    index = AllocationIndex(preprocessors)
+    for position in range(2, 12):
+        preprocessors[-1].add_packet(Packet(1000, 0, PacketType.UNCHECKED))
+        preprocessors.append(Preprocessor(1000, 100, position))
+        index.track(preprocessors[-1])
+        assert index.first_fit(1) is preprocessors[-1]
+        assert index.first_fit(1001) is None
+
+
+def run_simulation(use_allocation_index, placement, scale_in_cooldown):
+    intensities = [int(intensity * 0.25) for intensity in generate_intensities()]
+    simulation = AttackSimulation(1000, 100, PROCESSING_TIMES, TTL_VALUES, build_packet_types(PACKET_DISTRIBUTION),
+                                  seed=0, use_allocation_index=use_allocation_index, placement=placement,
+                                  scale_in_cooldown=scale_in_cooldown, warm_pool_size=2, flow_count=50)
+    simulation.run(intensities)
+    return simulation
+
+
+@pytest.mark.parametrize("scale_in_cooldown", [None, 2])
+@pytest.mark.parametrize("placement", list(PLACEMENT_POLICIES))
+def test_index_allocates_exactly_like_the_scan(placement, scale_in_cooldown):
+    indexed = run_simulation(True, placement, scale_in_cooldown)
+    scanned = run_simulation(False, placement, scale_in_cooldown)
+    assert max(row["physical_preprocessors"] for row in indexed.snapshots) > 1
+    assert indexed.snapshots == scanned.snapshots
+    assert indexed.preprocessor_rows() == scanned.preprocessor_rows()
@@ -0,0 +1,59 @@
+import random
+from collections import Counter
+
+from anomaly_detection import AnomalyDetector, MisraGries
+from main import SimulationClock
+
+
+def test_misra_gries_error_bounds():
+    rng = random.Random(0)
+    for capacity in (1, 4, 16, 64):
+        summary = MisraGries(capacity)
+        exact = Counter()
+        for _ in range(20000):
+            key = rng.randrange(5) if rng.random() < 0.5 else rng.randrange(10000)
+            summary.update(key)
+            exact[key] += 1
+        slack = summary.total / (capacity + 1)
+        assert len(summary.counters) <= capacity
+        for key, count in exact.items():
+            assert count - slack <= summary.estimate(key) <= count
+            if count > slack:
+                assert key in summary.counters
+
+
+def test_misra_gries_top_and_decay():
+    summary = MisraGries(8)
+    for key, count in (("a", 50), ("b", 30), ("c", 1)):
+        for _ in range(count):
+            summary.update(key)
+    assert [key for key, _ in summary.top(2)] == ["a", "b"]
+    summary.decay(0.5)
+    assert summary.estimate("a") == 25 and summary.total == 40.5
+    summary.decay(0.5)
+    assert summary.estimate("a") == 12.5
+    assert "c" not in summary.counters  # Counts that decay below one half are dropped
+
+
+def feed(detector, clock, start, seconds, rate, sources):
+    for packet in range(int(seconds * rate)):
+        clock.advance_to(start + packet / rate)
+        detector.observe(sources(packet), "10.0.0.1")
+
+
+def test_detector_raises_on_a_flood_and_clears_after_it():
+    rng = random.Random(1)
+    clock = SimulationClock()
+    detector = AnomalyDetector(clock, window=10)
+    feed(detector, clock, 0, 20, 1000, lambda _: rng.randrange(100000))
+    assert not detector.anomalous and not detector.raised_at
+
+    feed(detector, clock, 20, 5, 20000, lambda packet: "attacker" if packet % 2 else rng.randrange(100000))
+    assert detector.anomalous
+    assert 20 <= detector.raised_at[0] < 20.2
+    assert detector.is_suspect("attacker")
+    assert not detector.is_suspect(rng.randrange(100000))
+
+    feed(detector, clock, 25, 10, 1000, lambda _: rng.randrange(100000))
+    assert not detector.anomalous
+    assert 25 < detector.cleared_at[0] < 35
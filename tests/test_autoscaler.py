@@ -0,0 +1,36 @@
+import pytest
+
+from headless import load_config
+from main import AttackSimulation, build_packet_types
+
+PROCESSING_TIMES = {"unchecked": 1000000, "whitelisted": 1000000, "blacklisted": 1000000, "signature-based": 1000000}
+TTL_VALUES = {"unchecked": -1, "whitelisted": -1, "blacklisted": -1, "signature-based": -1}
+PACKET_TYPES = build_packet_types({"unchecked": 100, "whitelisted": 0, "blacklisted": 0, "signature-based": 0})
+
+
+def simulation(**settings):
+    return AttackSimulation(1000, 100, PROCESSING_TIMES, TTL_VALUES, PACKET_TYPES, seed=0, **settings)
+
+
+def test_min_preprocessors_below_one_is_rejected():
+    with pytest.raises(ValueError):
+        simulation(min_preprocessors=0)
+    with pytest.raises(ValueError):
+        load_config(overrides=[("min_preprocessors", 0)])
+
+
+def test_scale_in_stops_at_min_preprocessors():
+    run = simulation(scale_in_cooldown=2, warm_pool_size=1)
+    run.run([3000, 0, 0, 0, 0, 0])
+    assert run.snapshots[0]["physical_preprocessors"] == 3
+    assert run.snapshots[-1]["physical_preprocessors"] == 1
+    assert len(run.autoscaler.warm_pool) == 1
+    assert len(run.autoscaler.terminated) == 1
+
+
+def test_warm_preprocessors_are_reused_before_new_ones():
+    run = simulation(scale_in_cooldown=2, warm_pool_size=2)
+    run.run([3000, 0, 0, 0, 0, 3000])
+    assert run.snapshots[-1]["physical_preprocessors"] == 3
+    assert run.snapshots[-1]["warm_preprocessors"] == 0
+    assert run.autoscaler.started_preprocessors == 3
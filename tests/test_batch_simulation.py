@@ -0,0 +1,46 @@
+import pytest
+
+from batch_simulation import BatchAttackSimulation
+from main import PACKET_TYPES, AttackSimulation, build_packet_types, generate_intensities
+
+PACKET_DISTRIBUTION = {"unchecked": 25, "whitelisted": 25, "blacklisted": 25, "signature-based": 25}
+
+
+def both_models(scale, seed=0):
+    processing_times = {"unchecked": 100 * scale, "whitelisted": 150 * scale, "blacklisted": 200 * scale,
+                        "signature-based": 250 * scale}
+    ttl_values = {"unchecked": -1, "whitelisted": 120 * scale, "blacklisted": -1, "signature-based": -1}
+    arguments = (1000, 100, processing_times, ttl_values, build_packet_types(PACKET_DISTRIBUTION))
+    reference = AttackSimulation(*arguments, seed=seed)
+    reference.run(generate_intensities())
+    batch = BatchAttackSimulation(*arguments, seed=seed)
+    batch.run(generate_intensities())
+    return reference, batch
+
+
+@pytest.mark.parametrize("scale", [1, 1000, 2000, 10000])
+def test_batch_mode_stays_close_to_the_reference(scale):
+    reference, batch = both_models(scale)
+    peak = max(row["physical_preprocessors"] for row in reference.snapshots)
+    peak_virtual = max(row["virtual_preprocessors"] for row in reference.snapshots)
+    assert abs(max(row["physical_preprocessors"] for row in batch.snapshots) - peak) <= max(1, 0.05 * peak)
+    virtual_errors = []
+    for expected, actual in zip(reference.snapshots, batch.snapshots):
+        assert abs(actual["physical_preprocessors"] - expected["physical_preprocessors"]) <= 2 + 0.1 * peak
+        virtual_errors.append(abs(actual["virtual_preprocessors"] - expected["virtual_preprocessors"]))
+        # Same packets per second, with types drawn from different generators
+        assert sum(actual[name] for name in PACKET_TYPES) == sum(expected[name] for name in PACKET_TYPES)
+    # In-flight counts swing with the random type mix of a few dozen packets, so only their average is held tight
+    assert max(virtual_errors) <= 2 + 0.35 * peak_virtual
+    assert sum(virtual_errors) / len(virtual_errors) <= 1 + 0.1 * peak_virtual
+    final, batch_final = reference.snapshots[-1], batch.snapshots[-1]
+    for column in PACKET_TYPES + ["expired"]:
+        assert batch_final[column] == pytest.approx(final[column], rel=0.05)
+
+
+def test_preprocessor_rows_hold_plain_numbers():
+    _, batch = both_models(1000)
+    rows = batch.preprocessor_rows()
+    assert len(rows) == batch.snapshots[-1]["physical_preprocessors"]
+    for row in rows:
+        assert all(type(value) in (str, int, float) for value in row.values())
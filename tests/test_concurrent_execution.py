@@ -0,0 +1,55 @@
+import threading
+
+import pytest
+
+from concurrent_execution import ConcurrentFleet, percentile
+from signature_matching import AhoCorasick
+
+PAYLOADS = [b"an evil payload" if position % 3 == 0 else b"benign traffic" for position in range(300)]
+
+
+def run_with_timeout(fleet, payloads, timeout=30):
+    reports = []
+    runner = threading.Thread(target=lambda: reports.append(fleet.run(payloads)), daemon=True)
+    runner.start()
+    runner.join(timeout)
+    assert not runner.is_alive(), "ConcurrentFleet.run did not finish"
+    return reports[0]
+
+
+@pytest.mark.parametrize("backend", ["thread", "process"])
+def test_every_payload_is_inspected(backend):
+    fleet = ConcurrentFleet(AhoCorasick([b"evil"]), 400, 100, backend, queue_per_worker=1, max_preprocessors=2)
+    report = run_with_timeout(fleet, PAYLOADS)
+    assert report["packets"] == len(PAYLOADS)
+    assert report["malicious"] == 100
+    assert 1 <= report["preprocessors"] <= 2
+    assert report["workers"] == report["preprocessors"] * 4
+
+
+def test_process_backend_works_without_fork():
+    # Windows and macOS spawn their workers, which then need a pickled copy of the matcher
+    fleet = ConcurrentFleet(AhoCorasick([b"evil"]), 200, 100, "process", queue_per_worker=1, max_preprocessors=1,
+                            start_method="spawn")
+    report = run_with_timeout(fleet, PAYLOADS, timeout=60)
+    assert report["packets"] == len(PAYLOADS)
+    assert report["malicious"] == 100
+
+
+def test_fleet_can_run_again():
+    fleet = ConcurrentFleet(AhoCorasick([b"evil"]), 200, 100, "thread", queue_per_worker=1, max_preprocessors=1)
+    first = run_with_timeout(fleet, PAYLOADS)
+    second = run_with_timeout(fleet, PAYLOADS)
+    assert first["packets"] == second["packets"] == len(PAYLOADS)
+    assert second["malicious"] == 100
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        ConcurrentFleet(AhoCorasick(()), 100, 100, "gpu")
+
+
+def test_percentile():
+    assert percentile([], 0.5) == 0.0
+    assert percentile(list(range(100)), 0.99) == 99
+    assert percentile([1, 2], 1.0) == 2
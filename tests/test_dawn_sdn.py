@@ -0,0 +1,121 @@
+from types import SimpleNamespace
+
+from dawn_sdn import DAWN_SDN_Defense, Preprocessor_Defense
+
+
+def packet(src_ip, content=b""):
+    return SimpleNamespace(src_ip=src_ip, dst_ip=None, content=content)
+
+
+def test_connected_preprocessors_receive_new_signatures():
+    sdn = DAWN_SDN_Defense()
+    sdn.add_signatures([b"first"])
+    preprocessors = [Preprocessor_Defense() for _ in range(3)]
+    for preprocessor in preprocessors:
+        sdn.connect_preprocessor(preprocessor)
+    assert all(preprocessor.inspect_packet(packet("1.1.1.1", b"xx first")) == "Malicious"
+               for preprocessor in preprocessors)
+
+    sdn.add_signatures([b"second"])
+    assert all(preprocessor.inspect_packet(packet("1.1.1.1", b"a second one")) == "Malicious"
+               for preprocessor in preprocessors)
+    assert len({id(preprocessor.signature_list) for preprocessor in preprocessors}) == 1
+
+    sdn.distribute_signature_list(preprocessors[0])
+    assert len(sdn.preprocessors) == 3
+
+
+def test_feedback_is_batched_per_preprocessor():
+    sdn = DAWN_SDN_Defense(feedback_batch_size=4)
+    preprocessor = Preprocessor_Defense()
+    sdn.connect_preprocessor(preprocessor)
+    for src_ip, result in (("1.1.1.1", "Benign"), ("1.1.1.1", "Malicious"), ("2.2.2.2", "Benign")):
+        preprocessor.feedback_to_sdn(packet(src_ip), result)
+    assert sdn.feedback.batches.empty()  # Held until the batch fills or the SDN applies feedback
+    preprocessor.feedback_to_sdn(packet("2.2.2.2"), "Benign")
+    assert sdn.feedback.batches.qsize() == 1
+    assert sdn.feedback.drain() == ({"1.1.1.1"}, {"2.2.2.2"})  # A malicious verdict outranks a benign one
+
+
+def test_apply_feedback_flushes_partial_batches():
+    sdn = DAWN_SDN_Defense()
+    preprocessors = [Preprocessor_Defense() for _ in range(2)]
+    for preprocessor in preprocessors:
+        sdn.connect_preprocessor(preprocessor)
+    preprocessors[0].feedback_to_sdn(packet("6.6.6.6"), "Malicious")
+    preprocessors[1].feedback_to_sdn(packet("7.7.7.7"), "Benign")
+    lists = sdn.apply_feedback()
+    assert lists.version == 1
+    assert "6.6.6.6" in sdn.blacklist and "7.7.7.7" in sdn.whitelist
+    assert sdn.apply_feedback() is lists  # Nothing new, no new version
+
+
+def test_reconnecting_replaces_the_writer_and_keeps_its_feedback():
+    sdn = DAWN_SDN_Defense()
+    preprocessor = Preprocessor_Defense()
+    sdn.connect_preprocessor(preprocessor)
+    preprocessor.feedback_to_sdn(packet("6.6.6.6"), "Malicious")
+    for _ in range(3):
+        sdn.connect_preprocessor(preprocessor)
+    assert len(sdn.feedback.writers) == 1
+    preprocessor.feedback_to_sdn(packet("7.7.7.7"), "Benign")
+    assert sdn.feedback.drain() == ({"6.6.6.6"}, {"7.7.7.7"})
+
+
+def test_unconnected_preprocessor_keeps_its_feedback():
+    preprocessor = Preprocessor_Defense()
+    preprocessor.feedback_to_sdn(packet("6.6.6.6"), "Malicious")
+    assert preprocessor.feedback.feedback_queue.drain() == ({"6.6.6.6"}, set())
+
+
+def test_published_versions_are_never_modified():
+    sdn = DAWN_SDN_Defense()
+    first = sdn.update_lists({"add_to_blacklist": ["10.0.0.0/8"], "add_to_whitelist": ["192.168.0.1"]})
+    second = sdn.update_lists({"add_to_blacklist": ["172.16.0.1"], "add_to_whitelist": []})
+    assert (first.version, second.version) == (1, 2)
+    assert "172.16.0.1" in second.blacklist and "172.16.0.1" not in first.blacklist
+    assert "10.1.2.3" in second.blacklist and "192.168.0.1" in second.whitelist
+    assert sdn.lists is second
+
+
+class MainSDN:
+    def __init__(self, acknowledge=True):
+        self.acknowledge = acknowledge
+        self.updates = []
+
+    def receive_update(self, threat_data):
+        self.updates.append(threat_data)
+        return threat_data["version"] if self.acknowledge else None
+
+
+def test_main_sdn_gets_deltas_until_it_acknowledges():
+    sdn = DAWN_SDN_Defense()
+    sdn.update_lists({"add_to_blacklist": ["6.6.6.6"], "add_to_whitelist": ["1.1.1.1"]})
+    sdn.add_signatures([b"evil"])
+    offline = MainSDN(acknowledge=False)
+    sdn.update_main_sdn(offline)
+    sdn.update_main_sdn(offline)
+    assert offline.updates[0] == offline.updates[1] == {
+        "from_version": 0, "version": 2, "blacklist": [("6.6.6.6", "6.6.6.6")], "new_signatures": [b"evil"]}
+
+    main_sdn = MainSDN()
+    sdn.update_main_sdn(main_sdn)
+    assert sdn.acknowledged_version == 2 and sdn.deltas == []
+    sdn.update_main_sdn(main_sdn)
+    assert len(main_sdn.updates) == 1  # Nothing new to send
+
+    sdn.update_lists({"add_to_blacklist": ["7.7.7.7"], "add_to_whitelist": []})
+    sdn.update_main_sdn(main_sdn)
+    assert main_sdn.updates[-1] == {
+        "from_version": 2, "version": 3, "blacklist": [("7.7.7.7", "7.7.7.7")], "new_signatures": []}
+
+
+def test_partly_acknowledged_deltas_are_kept():
+    sdn = DAWN_SDN_Defense()
+    sdn.update_lists({"add_to_blacklist": ["6.6.6.6"], "add_to_whitelist": []})
+    sdn.add_signatures([b"evil"])
+    main_sdn = MainSDN()
+    main_sdn.receive_update = lambda threat_data: 1  # Applied the first version only
+    sdn.update_main_sdn(main_sdn)
+    assert sdn.acknowledged_version == 1
+    assert sdn.deltas == [(2, [], [b"evil"])]
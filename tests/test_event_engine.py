@@ -0,0 +1,82 @@
+import pytest
+
+from headless import load_config, run_simulation
+from main import (ARRIVAL, PROCESSING_COMPLETE, TTL_EXPIRY, AttackSimulation, EventQueue, SimulationClock,
+                  build_packet_types)
+
+WHITELISTED_ONLY = build_packet_types({"unchecked": 0, "whitelisted": 100, "blacklisted": 0, "signature-based": 0})
+
+
+def simulation(processing_time, ttl, seed=0, packet_types=WHITELISTED_ONLY):
+    processing_times = {"unchecked": 100, "whitelisted": processing_time, "blacklisted": 100, "signature-based": 100}
+    ttl_values = {"unchecked": -1, "whitelisted": ttl, "blacklisted": -1, "signature-based": -1}
+    return AttackSimulation(1000, 100, processing_times, ttl_values, packet_types, seed=seed)
+
+
+@pytest.mark.parametrize("processing_time,ttl,expired", [(500000, 200000, 10), (200000, 500000, 0),
+                                                         (300000, 300000, 10), (300000, -1, 0)])
+def test_ttl_or_processing_whichever_is_first(processing_time, ttl, expired):
+    run = simulation(processing_time, ttl)
+    run.run([1000, 0])
+    assert run.snapshots[-1]["expired"] == expired
+    assert run.snapshots[-1]["virtual_preprocessors"] == 0
+
+
+def test_departure_times():
+    run = simulation(500000, 200000)
+    run.schedule_second(1, 100)
+    run.run_until(0.2 - 1e-9)
+    assert run.preprocessors[0].thread_count == 1
+    run.run_until(0.2)
+    assert run.preprocessors[0].thread_count == 0 and run.preprocessors[0].total_expired_packets == 1
+
+
+def test_same_time_events_free_capacity_first():
+    events = EventQueue()
+    events.schedule(1.0, ARRIVAL, "arrival 1")
+    events.schedule(1.0, PROCESSING_COMPLETE, "complete 1")
+    events.schedule(1.0, TTL_EXPIRY, "expiry")
+    events.schedule(1.0, PROCESSING_COMPLETE, "complete 2")
+    events.schedule(1.0, ARRIVAL, "arrival 2")
+    events.schedule(0.5, ARRIVAL, "earlier")
+    popped = [events.pop()[2] for _ in range(len(events))]
+    assert popped == ["earlier", "expiry", "complete 1", "complete 2", "arrival 1", "arrival 2"]
+
+
+def test_clock_never_goes_back():
+    clock = SimulationClock()
+    clock.advance_to(1.5)
+    with pytest.raises(ValueError):
+        clock.advance_to(1.0)
+
+
+@pytest.mark.parametrize("setting", [("ttl_values.whitelisted", 0), ("processing_times.unchecked", 0)])
+def test_zero_duration_holds(setting):
+    run = run_simulation(load_config(overrides=[setting]))
+    assert run.snapshots[-1]["virtual_preprocessors"] <= 1
+
+
+def test_zero_ttl_expires_every_packet_on_arrival():
+    run = simulation(300000, 0)
+    run.run([1000])
+    assert run.snapshots[-1]["expired"] == 10
+    assert run.snapshots[-1]["physical_preprocessors"] == 1
+
+
+def test_invalid_timings_are_rejected():
+    with pytest.raises(ValueError):
+        simulation(100, -2)
+    with pytest.raises(ValueError):
+        simulation(-1, -1)
+    with pytest.raises(ValueError):
+        load_config(overrides=[("ttl_values.blacklisted", -5)])
+
+
+def test_same_seed_same_run():
+    packet_types = build_packet_types({"unchecked": 25, "whitelisted": 25, "blacklisted": 25, "signature-based": 25})
+    runs = [simulation(400000, 250000, seed, packet_types) for seed in (7, 7, 8)]
+    for run in runs:
+        run.run([3000, 5000, 1000, 0])
+    assert runs[0].snapshots == runs[1].snapshots
+    assert runs[0].preprocessor_rows() == runs[1].preprocessor_rows()
+    assert runs[0].preprocessor_rows() != runs[2].preprocessor_rows()
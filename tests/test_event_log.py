@@ -0,0 +1,40 @@
+import json
+
+from event_log import DEBUG, DISABLED_EVENT_LOG, INFO, WARNING, EventLog
+
+
+def read_records(path):
+    with open(path) as log_file:
+        return [json.loads(line) for line in log_file]
+
+
+def test_records_below_the_level_are_dropped(tmp_path):
+    path = tmp_path / "events.jsonl"
+    with EventLog(str(path), level="info") as event_log:
+        assert event_log.info and not event_log.debug
+        event_log.emit(DEBUG, "packet-allocated", 0.1, preprocessor=1)
+        event_log.emit(INFO, "preprocessor-started", 0.2, preprocessor=2)
+        event_log.emit(WARNING, "fleet-full", 0.3)
+    assert read_records(path) == [
+        {"time": 0.2, "level": "info", "event": "preprocessor-started", "preprocessor": 2},
+        {"time": 0.3, "level": "warning", "event": "fleet-full"},
+    ]
+
+
+def test_close_writes_every_buffered_record(tmp_path):
+    path = tmp_path / "events.jsonl"
+    event_log = EventLog(str(path), level=DEBUG, batch_size=100)
+    for position in range(1050):  # Ten full batches and a partial one still in the buffer
+        event_log.emit(DEBUG, "packet-allocated", position / 1000, position=position)
+    event_log.close()
+    event_log.close()  # Closing twice is harmless
+    assert [record["position"] for record in read_records(path)] == list(range(1050))
+
+
+def test_disabled_log_writes_nothing(tmp_path):
+    assert not DISABLED_EVENT_LOG.debug and not DISABLED_EVENT_LOG.info
+    DISABLED_EVENT_LOG.emit(WARNING, "ignored", 0)
+    assert DISABLED_EVENT_LOG.buffer == []
+    event_log = EventLog(str(tmp_path / "events.jsonl"), level="off")
+    event_log.close()
+    assert not (tmp_path / "events.jsonl").exists()
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from fleet_estimator import FleetEstimator, estimate_error
+from headless import load_config, run_headless, run_simulation
+from main import build_packet_types
+
+PACKET_TYPES = build_packet_types({"unchecked": 50, "whitelisted": 50, "blacklisted": 0, "signature-based": 0})
+PROCESSING_TIMES = {"unchecked": 2000000, "whitelisted": 3000000, "blacklisted": 1, "signature-based": 1}
+
+
+def test_steady_state_follows_littles_law():
+    # Constant traffic: load in flight is intensity * holding time, with the whitelisted TTL cutting 3 s to 1 s
+    ttl_values = {"unchecked": -1, "whitelisted": 1000000, "blacklisted": -1, "signature-based": -1}
+    estimator = FleetEstimator(1000, 100, PROCESSING_TIMES, ttl_values, PACKET_TYPES)
+    snapshots = estimator.run([1000] * 10)
+    assert snapshots[-1]["total_load"] == pytest.approx(1000 * (0.5 * 2 + 0.5 * 1))
+    assert snapshots[-1]["virtual_preprocessors"] == pytest.approx(15)
+    assert snapshots[-1]["physical_preprocessors"] == 2
+    assert snapshots[-1]["expired"] == pytest.approx(0.5 * 10 * (10 - 1))
+    assert snapshots[0]["total_load"] == pytest.approx(1000)  # Nothing has finished after the first second
+    assert snapshots[-1]["average_utilization"] == pytest.approx(1500 / 2000 * 100)
+
+
+def test_ttl_follows_the_simulator_rule():
+    # A TTL of 0 expires packets on arrival, -1 means no TTL, and other negative TTLs are rejected
+    ttl_values = {"unchecked": 0, "whitelisted": -1, "blacklisted": -1, "signature-based": -1}
+    estimator = FleetEstimator(1000, 100, PROCESSING_TIMES, ttl_values, PACKET_TYPES)
+    assert estimator.expiring.tolist() == [True, False, False, False]
+    assert estimator.holding_times.tolist() == [0, 3, 1e-6, 1e-6]
+    with pytest.raises(ValueError):
+        FleetEstimator(1000, 100, PROCESSING_TIMES, {**ttl_values, "unchecked": -2}, PACKET_TYPES)
+
+
+def test_fleet_never_shrinks_and_matches_the_simulator():
+    config = load_config(overrides=[("processing_times.unchecked", 1000000),
+                                    ("processing_times.whitelisted", 1500000),
+                                    ("processing_times.blacklisted", 2000000),
+                                    ("processing_times.signature-based", 2500000)])
+    simulation = run_simulation(config)
+    estimate = run_simulation({**config, "mode": "estimate"})
+    fleet = [row["physical_preprocessors"] for row in estimate.snapshots]
+    assert fleet == sorted(fleet)
+    error = estimate_error(estimate.snapshots, simulation.snapshots)
+    assert abs(error["peak_physical_preprocessors_error"]) <= 15
+    assert error["physical_preprocessors_mean_abs_error"] <= 3
+
+
+def test_headless_compare_writes_the_error(tmp_path):
+    config = load_config(overrides=[("mode", "estimate"), ("compare", True), ("plots", False)])
+    run_headless(config, str(tmp_path))
+    with open(tmp_path / "summary.json") as summary_file:
+        report = json.load(summary_file)
+    assert report["estimate_error"]["peak_physical_preprocessors_error"] == 0
+    with pytest.raises(ValueError):
+        load_config(overrides=[("compare", True)])
@@ -0,0 +1,33 @@
+import pytest
+
+from headless import load_config, run_simulation, summary_row, sweep_configs
+
+
+def test_sweep_runs_get_their_own_event_logs():
+    base_config = load_config(overrides=[("event_log", "logs/events.jsonl")])
+    configs = [config for _, config in sweep_configs(base_config, {"virtual_capacity": [50, 100], "seed": [0, 1]})]
+    assert [config["event_log"] for config in configs] == [f"logs/events.{run}.jsonl" for run in range(1, 5)]
+    assert base_config["event_log"] == "logs/events.jsonl"
+
+
+def test_sweep_without_event_log():
+    configs = [config for _, config in sweep_configs(load_config(), {"seed": [0, 1]})]
+    assert [config["event_log"] for config in configs] == [None, None]
+
+
+@pytest.mark.parametrize("mode", ["batch", "estimate"])
+@pytest.mark.parametrize("setting", [("scale_in_cooldown", 5), ("warm_pool_size", 2), ("event_log", "events.jsonl"),
+                                     ("profile", True), ("placement", "best-fit"), ("trace", "trace.pcap")])
+def test_packet_mode_settings_are_rejected_in_other_modes(mode, setting):
+    load_config(overrides=[setting])
+    with pytest.raises(ValueError):
+        load_config(overrides=[("mode", mode), setting])
+
+
+def test_every_mode_writes_the_same_per_second_columns():
+    columns = {}
+    for mode in ("packet", "batch", "estimate"):
+        simulation = run_simulation(load_config(overrides=[("mode", mode), ("intensities", [500, 1000, 200])]))
+        columns[mode] = list(simulation.snapshots[0])
+        assert summary_row(simulation)["dropped"] == 0
+    assert columns["packet"] == columns["batch"] == columns["estimate"]
@@ -0,0 +1,104 @@
+import ipaddress
+import random
+
+import numpy as np
+import pytest
+
+from ip_lookup import BloomFilter, PrefixSet, int_to_ip, ip_to_int, parse_range
+
+
+def random_entries(rng, count):
+    entries = []
+    for _ in range(count):
+        base = rng.getrandbits(32)
+        kind = rng.random()
+        if kind < 0.5:
+            entries.append(int_to_ip(base))
+        elif kind < 0.8:
+            entries.append(f"{int_to_ip(base)}/{rng.randint(16, 30)}")
+        else:
+            entries.append((base, min(base + rng.randint(0, 5000), 0xFFFFFFFF)))
+    return entries
+
+
+def brute_force_contains(ranges, address):
+    return any(first <= address <= last for first, last in ranges)
+
+
+def queries_near(rng, entries, count):
+    # Addresses on, just outside and far from the entries' boundaries
+    queries = [0, 0xFFFFFFFF]
+    for first, last in map(parse_range, entries):
+        queries += [first, last, max(first - 1, 0), min(last + 1, 0xFFFFFFFF)]
+    return queries + [rng.getrandbits(32) for _ in range(count)]
+
+
+@pytest.mark.parametrize("bloom_filter", [False, True])
+def test_prefix_set_matches_brute_force(bloom_filter):
+    rng = random.Random(0)
+    entries = random_entries(rng, 300)
+    prefix_set = PrefixSet(entries, bloom_filter=bloom_filter)
+    queries = queries_near(rng, entries, 2000)
+    ranges = [parse_range(entry) for entry in entries]
+    expected = [brute_force_contains(ranges, address) for address in queries]
+    assert [address in prefix_set for address in queries] == expected
+    assert prefix_set.contains_many(np.array(queries, dtype=np.uint32)).tolist() == expected
+    assert [int_to_ip(address) in prefix_set for address in queries[:200]] == expected[:200]
+
+
+def test_ranges_are_merged_and_disjoint():
+    prefix_set = PrefixSet(["10.0.0.0/24", "10.0.1.0/24", "10.0.0.5", (ip_to_int("10.0.2.0"), ip_to_int("10.0.2.9")),
+                            "192.168.0.1"])
+    assert prefix_set.ranges() == [("10.0.0.0", "10.0.2.9"), ("192.168.0.1", "192.168.0.1")]
+    assert len(prefix_set) == 2
+    rng = random.Random(1)
+    entries = random_entries(rng, 500)
+    ranges = [(ip_to_int(first), ip_to_int(last)) for first, last in PrefixSet(entries).ranges()]
+    for (_, previous_last), (first, _) in zip(ranges, ranges[1:]):
+        assert first > previous_last + 1
+
+
+def test_with_entries_leaves_the_original_alone():
+    original = PrefixSet(["10.0.0.0/8"], bloom_filter=True)
+    updated = original.with_entries(["192.168.1.1"])
+    assert "192.168.1.1" in updated and "10.2.3.4" in updated
+    assert "192.168.1.1" not in original
+    assert original.ranges() == [("10.0.0.0", "10.255.255.255")]
+
+
+def test_incremental_adds_match_a_bulk_build():
+    rng = random.Random(2)
+    entries = random_entries(rng, 200)
+    incremental = PrefixSet()
+    for entry in entries:
+        incremental.add(entry)
+        if rng.random() < 0.1:
+            len(incremental)  # Forces a build partway through
+    assert incremental.ranges() == PrefixSet(entries).ranges()
+
+
+def test_empty_set():
+    prefix_set = PrefixSet(bloom_filter=True)
+    assert "1.2.3.4" not in prefix_set
+    assert not prefix_set.contains_many(["1.2.3.4", 0]).any()
+
+
+def test_bloom_filter_has_no_false_negatives():
+    rng = random.Random(3)
+    keys = rng.sample(range(1 << 24), 5000)
+    bloom_filter = BloomFilter(len(keys), error_rate=0.01)
+    bloom_filter.add_many(keys)
+    assert all(key in bloom_filter for key in keys)
+    assert bloom_filter.contains_many(keys).all()
+    added = set(keys)
+    others = [key for key in rng.sample(range(1 << 24), 20000) if key not in added]
+    scalar = [key in bloom_filter for key in others]
+    assert scalar == bloom_filter.contains_many(others).tolist()
+    assert sum(scalar) / len(others) < 0.03
+
+
+def test_parse_range():
+    network = ipaddress.IPv4Network("172.16.0.0/12")
+    assert parse_range("172.16.5.4/12") == (int(network.network_address), int(network.broadcast_address))
+    assert parse_range("1.2.3.4") == (ip_to_int("1.2.3.4"),) * 2
+    assert parse_range(7) == (7, 7)
@@ -0,0 +1,45 @@
+from main import PACKET_TYPES, AttackSimulation, build_packet_types
+from metrics import read_csv, write_csv
+
+PROCESSING_TIMES = {"unchecked": 1000000, "whitelisted": 1500000, "blacklisted": 2000000, "signature-based": 2500000}
+TTL_VALUES = {"unchecked": -1, "whitelisted": 1200000, "blacklisted": -1, "signature-based": -1}
+PACKET_DISTRIBUTION = {"unchecked": 25, "whitelisted": 25, "blacklisted": 25, "signature-based": 25}
+
+
+def walk_fleet(simulation):
+    # The per-second totals recomputed the slow way, from every preprocessor
+    active = simulation.preprocessors
+    every = active + simulation.autoscaler.warm_pool + simulation.autoscaler.terminated
+    total_load = sum(preprocessor.current_load for preprocessor in active)
+    row = {
+        "physical_preprocessors": len(active),
+        "virtual_preprocessors": sum(preprocessor.thread_count for preprocessor in active),
+        "average_utilization": total_load / sum(preprocessor.device_capacity for preprocessor in active) * 100,
+        "total_load": total_load,
+        "expired": sum(preprocessor.total_expired_packets for preprocessor in every),
+    }
+    for packet_type, name in enumerate(PACKET_TYPES):
+        row[name] = sum(preprocessor.type_counts[packet_type] for preprocessor in every)
+    return row
+
+
+def test_snapshots_match_a_walk_over_the_fleet():
+    simulation = AttackSimulation(1000, 100, PROCESSING_TIMES, TTL_VALUES, build_packet_types(PACKET_DISTRIBUTION),
+                                  seed=0, scale_in_cooldown=1, warm_pool_size=2)
+    resumed = []
+    resume = simulation.metrics.resume
+    simulation.metrics.resume = lambda preprocessor: resumed.append(preprocessor) or resume(preprocessor)
+    intensities = [3000, 8000, 500, 0, 0, 0, 0, 9000, 2000, 0, 0, 0, 0, 0]
+    for second, intensity in enumerate(intensities, 1):
+        simulation.schedule_second(second, intensity)
+        simulation.finish_second(second)
+        snapshot = simulation.snapshots[-1]
+        assert {key: snapshot[key] for key in walk_fleet(simulation)} == walk_fleet(simulation)
+    assert simulation.autoscaler.terminated and resumed  # Both scale-in and warm-pool reuse were exercised
+
+
+def test_csv_round_trip(tmp_path):
+    rows = [{"second": 1, "physical_preprocessors": 2, "average_utilization": 12.5}]
+    write_csv(tmp_path / "rows.csv", rows)
+    assert read_csv(tmp_path / "rows.csv") == [{"second": "1", "physical_preprocessors": "2",
+                                                 "average_utilization": "12.5"}]
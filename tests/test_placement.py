@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from allocation_index import AllocationIndex, free_room
+from main import Packet, PacketType, Preprocessor
+from placement import BestFit, FlowAffinity, PowerOfTwoChoices, WorstFit, first_fit_scan
+
+
+def fleet(loads, device_capacity=1000, virtual_capacity=100):
+    # Full-size packets close their threads, so each preprocessor's free room is device_capacity minus its load
+    preprocessors = []
+    for position, load in enumerate(loads):
+        preprocessor = Preprocessor(device_capacity, virtual_capacity, position + 1)
+        for _ in range(load // virtual_capacity):
+            preprocessor.add_packet(Packet(virtual_capacity, 0, PacketType.UNCHECKED))
+        preprocessors.append(preprocessor)
+    return preprocessors
+
+
+def packet(load, flow_id=None):
+    return Packet(load, 0, PacketType.UNCHECKED, flow_id=flow_id)
+
+
+@pytest.mark.parametrize("indexed", [False, True])
+def test_best_fit_picks_the_least_room_that_fits(indexed):
+    preprocessors = fleet([300, 800, 500, 900])
+    policy = BestFit(AllocationIndex(preprocessors) if indexed else None)
+    assert policy.choose(packet(100), preprocessors) is preprocessors[3]
+    assert policy.choose(packet(200), preprocessors) is preprocessors[1]
+    assert policy.choose(packet(300), preprocessors) is preprocessors[2]
+    assert policy.choose(packet(700), preprocessors) is preprocessors[0]
+    assert policy.choose(packet(800), preprocessors) is None
+
+
+@pytest.mark.parametrize("indexed", [False, True])
+def test_worst_fit_picks_the_most_room(indexed):
+    preprocessors = fleet([300, 800, 200, 200])
+    policy = WorstFit(AllocationIndex(preprocessors) if indexed else None)
+    assert policy.choose(packet(100), preprocessors) is preprocessors[2]  # Leftmost of the two emptiest
+    assert policy.choose(packet(800), preprocessors) is preprocessors[2]
+    assert policy.choose(packet(801), preprocessors) is None
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_power_of_two_choices_keeps_the_emptier_sample(seed):
+    preprocessors = fleet([900, 800, 100, 1000, 500, 300])
+    policy = PowerOfTwoChoices(seed=seed)
+    samples = random.Random(seed)
+    for load in [100, 300, 600, 900, 100, 200]:
+        first = preprocessors[samples.randrange(len(preprocessors))]
+        second = preprocessors[samples.randrange(len(preprocessors))]
+        emptier = max(first, second, key=free_room)
+        expected = emptier if free_room(emptier) >= load else first_fit_scan(packet(load), preprocessors)
+        assert policy.choose(packet(load), preprocessors) is expected
+
+
+def test_flow_affinity_keeps_a_flow_on_its_hashed_preprocessor():
+    preprocessors = fleet([0] * 8)
+    policy = FlowAffinity()
+    for flow_id in range(50):
+        preferred = preprocessors[policy.flow_hash(packet(1, flow_id)) % len(preprocessors)]
+        assert policy.choose(packet(100, flow_id), preprocessors) is preferred
+
+
+def test_flow_affinity_probes_neighbours_then_falls_back_to_first_fit():
+    preprocessors = fleet([1000, 1000, 1000, 0, 1000, 0])
+    policy = FlowAffinity(probes=2)
+    for flow_id in range(50):
+        start = policy.flow_hash(packet(1, flow_id)) % len(preprocessors)
+        probed = [preprocessors[(start + offset) % len(preprocessors)] for offset in range(2)]
+        fitting = [preprocessor for preprocessor in probed if free_room(preprocessor) >= 100]
+        expected = fitting[0] if fitting else preprocessors[3]
+        assert policy.choose(packet(100, flow_id), preprocessors) is expected
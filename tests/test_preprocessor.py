@@ -0,0 +1,51 @@
+import random
+
+from main import Packet, PacketType, Preprocessor
+
+
+def linked_threads(preprocessor):
+    threads = []
+    thread = preprocessor.newest_thread
+    while thread is not None:
+        threads.append(thread)
+        thread = thread.previous_thread
+    return threads[::-1]
+
+
+def test_thread_list_matches_a_plain_list():
+    rng = random.Random(0)
+    preprocessor = Preprocessor(1000, 100)
+    reference = []  # The original threads list, in arrival order
+    for _ in range(5000):
+        if reference and rng.random() < 0.45:
+            packet = reference.pop(rng.randrange(len(reference)))
+            if rng.random() < 0.5:
+                preprocessor.remove_packet(packet)
+            else:
+                preprocessor.expire_packet(packet)
+        elif preprocessor.current_load + 100 <= preprocessor.device_capacity:
+            packet = Packet(100, 0, rng.choice(list(PacketType)))
+            preprocessor.add_packet(packet)
+            reference.append(packet)
+        threads = linked_threads(preprocessor)
+        assert threads == reference
+        assert preprocessor.thread_count == len(reference)
+        assert preprocessor.current_load == sum(packet.load for packet in reference)
+        assert preprocessor.last_thread() is (reference[-1] if reference else None)
+        for packet in threads:
+            if packet.next_thread is not None:
+                assert packet.next_thread.previous_thread is packet
+
+
+def test_small_packets_merge_into_the_last_thread():
+    preprocessor = Preprocessor(1000, 100)
+    opener = Packet(40, 0, PacketType.UNCHECKED)
+    preprocessor.add_packet(opener)
+    preprocessor.add_packet(Packet(60, 0, PacketType.WHITELISTED))
+    assert linked_threads(preprocessor) == [opener]
+    assert opener.load == 100
+    third = Packet(10, 0, PacketType.BLACKLISTED)
+    preprocessor.add_packet(third)
+    assert linked_threads(preprocessor) == [opener, third]
+    assert preprocessor.type_counts == [1, 1, 1, 0]
+    assert preprocessor.times_reused == 1
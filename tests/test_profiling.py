@@ -0,0 +1,45 @@
+import time
+
+import pytest
+
+from main import AttackSimulation, build_packet_types
+from profiling import DISABLED_PROFILER, PhaseProfiler
+
+
+def test_counters_aggregate_total_mean_and_max():
+    profiler = PhaseProfiler()
+    for value in (3, 1, 4, 1, 5):
+        profiler.observe("scan_length", value)
+    profiler.observe("started")
+    profiler.observe("negative", -2)
+    counters = profiler.report()["counters"]
+    assert counters["scan_length"] == {"total": 14, "samples": 5, "mean": 2.8, "max": 5}
+    assert counters["started"] == {"total": 1, "samples": 1, "mean": 1, "max": 1}
+    assert counters["negative"]["max"] == -2
+
+
+def test_phases_aggregate_calls_and_time():
+    profiler = PhaseProfiler()
+    for _ in range(3):
+        started = time.perf_counter()
+        time.sleep(0.002)
+        profiler.add_time("sleep", started)
+    phase = profiler.report()["phases"]["sleep"]
+    assert phase["calls"] == 3
+    assert phase["seconds"] >= 0.006
+    assert phase["us_per_call"] == pytest.approx(phase["seconds"] / 3 * 1e6)
+
+
+def test_simulation_reports_its_phases():
+    packet_types = build_packet_types({"unchecked": 100, "whitelisted": 0, "blacklisted": 0, "signature-based": 0})
+    timings = {"unchecked": 1500000, "whitelisted": 1, "blacklisted": 1, "signature-based": 1}
+    ttls = dict.fromkeys(timings, -1)
+    profiler = PhaseProfiler()
+    AttackSimulation(1000, 100, timings, ttls, packet_types, seed=0, profiler=profiler).run([2000, 0, 0])
+    report = profiler.report()
+    assert report["phases"]["allocate_packet_to_preprocessor"]["calls"] == 20
+    assert report["phases"]["handle_packet_departure"]["calls"] == 20
+    assert report["phases"]["record_second"]["calls"] == 3
+    assert report["counters"]["preprocessors_started"]["total"] == 1
+    AttackSimulation(1000, 100, timings, ttls, packet_types, seed=0).run([2000])
+    assert DISABLED_PROFILER.report() == {"phases": {}, "counters": {}}
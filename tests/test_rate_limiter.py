@@ -0,0 +1,59 @@
+import random
+
+from main import SimulationClock
+from rate_limiter import SourceRateLimiter
+
+
+class ReferenceLimiter:
+    # The same token buckets, with the LRU order kept in a plain list
+    def __init__(self, rate, burst, max_sources):
+        self.rate, self.burst, self.max_sources = rate, burst, max_sources
+        self.tokens, self.refilled, self.order = {}, {}, []
+
+    def allow(self, source, now):
+        if source not in self.tokens:
+            if len(self.order) >= self.max_sources:
+                evicted = self.order.pop(0)
+                del self.tokens[evicted], self.refilled[evicted]
+            self.order.append(source)
+            self.tokens[source], self.refilled[source] = self.burst - 1, now
+            return True
+        self.order.remove(source)
+        self.order.append(source)
+        tokens = min(self.tokens[source] + (now - self.refilled[source]) * self.rate, self.burst)
+        self.refilled[source] = now
+        allowed = tokens >= 1
+        self.tokens[source] = tokens - 1 if allowed else tokens
+        return allowed
+
+
+def test_limiter_matches_reference():
+    rng = random.Random(0)
+    for max_sources in (3, 20, 1000):
+        clock = SimulationClock()
+        limiter = SourceRateLimiter(clock, rate=5, burst=8, max_sources=max_sources)
+        reference = ReferenceLimiter(5, 8, max_sources)
+        for _ in range(20000):
+            clock.advance_to(clock.now + rng.expovariate(200))
+            source = rng.randrange(30) if rng.random() < 0.9 else rng.randrange(3)
+            assert limiter.allow(source) == reference.allow(source, clock.now)
+        assert len(limiter) == len(reference.order) <= max_sources
+
+
+def test_one_source_gets_its_burst_then_its_rate():
+    clock = SimulationClock()
+    limiter = SourceRateLimiter(clock, rate=10, burst=20)
+    assert sum(limiter.allow("10.0.0.1") for _ in range(100)) == 20
+    assert limiter.allow("10.0.0.2")  # Other sources are unaffected
+    clock.advance_to(1.0)
+    assert sum(limiter.allow("10.0.0.1") for _ in range(100)) == 10
+    assert limiter.limited_packets == 170
+
+
+def test_table_stays_bounded():
+    clock = SimulationClock()
+    limiter = SourceRateLimiter(clock, rate=1, max_sources=100)
+    for source in range(10000):
+        assert limiter.allow(source)
+    assert len(limiter) == 100
+    assert limiter.evicted_sources == 9900
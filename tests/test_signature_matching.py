@@ -0,0 +1,73 @@
+import random
+
+import pytest
+
+from signature_matching import AhoCorasick, SignatureSet
+
+
+def brute_force_matches(signatures, payload):
+    return sorted((start + len(signature), signature) for signature in set(signatures)
+                  for start in range(len(payload) - len(signature) + 1)
+                  if payload[start:start + len(signature)] == signature)
+
+
+def random_signatures(rng, count, alphabet):
+    return [bytes(rng.choice(alphabet) for _ in range(rng.randint(1, 6))) for _ in range(count)]
+
+
+@pytest.mark.parametrize("alphabet", [b"ab", b"abcd", bytes(range(256))])
+def test_automaton_matches_brute_force(alphabet):
+    rng = random.Random(len(alphabet))
+    for _ in range(50):
+        signatures = random_signatures(rng, rng.randint(1, 20), alphabet)
+        automaton = AhoCorasick(signatures)
+        payload = bytes(rng.choice(alphabet) for _ in range(rng.randint(0, 200)))
+        expected = brute_force_matches(signatures, payload)
+        assert sorted(automaton.find_all(payload)) == expected
+        first = automaton.first_match(payload)
+        if expected:
+            assert (expected[0][0], first) in expected
+        else:
+            assert first is None
+
+
+def test_payload_types():
+    automaton = AhoCorasick(["evil", b"\x00\xff"])
+    assert automaton.first_match("an evil payload") == b"evil"
+    assert automaton.first_match(memoryview(b"xx\x00\xffyy")) == b"\x00\xff"
+    assert automaton.first_match(bytearray(b"benign")) is None
+    assert automaton.first_match(b"") is None
+    assert AhoCorasick(()).first_match(b"anything") is None
+    with pytest.raises(ValueError):
+        AhoCorasick([b""])
+
+
+def test_signature_set_layers_and_merges():
+    rng = random.Random(0)
+    signatures = random_signatures(rng, 200, b"abcdef")
+    signature_set = SignatureSet(signatures[:100], merge_fraction=0.1)
+    base = signature_set.compiled()
+    assert signature_set.compiled() is base  # Shared until signatures are added
+
+    signature_set.update(signatures[100:105])
+    layered = signature_set.compiled()
+    assert layered is not base and signature_set.base is base  # A few new signatures get their own layer
+    signature_set.update(signatures[105:])
+    merged = signature_set.compiled()
+    assert signature_set.base is merged  # Many new signatures trigger one full rebuild
+
+    for matcher, known in ((base, signatures[:100]), (layered, signatures[:105]), (merged, signatures)):
+        for _ in range(20):
+            payload = bytes(rng.choice(b"abcdefg") for _ in range(100))
+            expected = brute_force_matches(known, payload)
+            assert sorted(matcher.find_all(payload)) == expected
+            assert (matcher.first_match(payload) is None) == (not expected)
+
+
+def test_signature_set_ignores_duplicates():
+    signature_set = SignatureSet(["abc"])
+    matcher = signature_set.compiled()
+    signature_set.update(["abc", b"abc"])
+    assert len(signature_set) == 1
+    assert "abc" in signature_set
+    assert signature_set.compiled() is matcher
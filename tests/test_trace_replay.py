@@ -0,0 +1,124 @@
+import random
+import struct
+
+import pytest
+
+from headless import load_config, run_simulation, summary_row
+from ip_lookup import ip_to_int
+from trace_replay import (ETHERNET, LINUX_SLL, RAW_IP, TracePacket, in_timestamp_order, read_csv_trace, read_pcap,
+                          replay_trace)
+
+
+def ipv4_packet(src_ip, dst_ip, payload, protocol="tcp", options=b""):
+    if protocol == "tcp":
+        transport = struct.pack("!HHIIBBHHH", 1234, 80, 0, 0, 6 << 4, 0, 0, 0, 0) + b"\x01\x01\x01\x00" + payload
+    else:
+        transport = struct.pack("!HHHH", 53, 53, 8 + len(payload), 0) + payload
+    header_length = 20 + len(options)
+    return struct.pack("!BBHHHBBH4s4s", 0x40 | header_length // 4, 0, header_length + len(transport), 0, 0, 64,
+                       6 if protocol == "tcp" else 17, 0, ip_to_int(src_ip).to_bytes(4, "big"),
+                       ip_to_int(dst_ip).to_bytes(4, "big")) + options + transport
+
+
+def link_frame(link_type, packet, vlan=False, ethertype=0x0800):
+    if link_type == ETHERNET:
+        if vlan:
+            return b"\x00" * 12 + struct.pack("!HHH", 0x8100, 7, ethertype) + packet
+        return b"\x00" * 12 + struct.pack("!H", ethertype) + packet
+    if link_type == LINUX_SLL:
+        return b"\x00" * 14 + struct.pack("!H", ethertype) + packet
+    return packet
+
+
+def write_pcap(path, link_type, records, byte_order="<", nanoseconds=False):
+    magic = 0xA1B23C4D if nanoseconds else 0xA1B2C3D4
+    with open(path, "wb") as pcap:
+        pcap.write(struct.pack(byte_order + "IHHiIII", magic, 2, 4, 0, 0, 65535, link_type))
+        for timestamp, frame in records:
+            fraction = round(timestamp % 1 * (1e9 if nanoseconds else 1e6))
+            pcap.write(struct.pack(byte_order + "IIII", int(timestamp), fraction, len(frame), len(frame) + 4))
+            pcap.write(frame)
+
+
+@pytest.mark.parametrize("link_type,vlan", [(ETHERNET, False), (ETHERNET, True), (LINUX_SLL, False), (RAW_IP, False)])
+@pytest.mark.parametrize("byte_order,nanoseconds", [("<", False), (">", False), ("<", True)])
+def test_pcap_packets_match_what_was_written(tmp_path, link_type, vlan, byte_order, nanoseconds):
+    rng = random.Random(0)
+    expected = []
+    records = []
+    for position in range(50):
+        src_ip, dst_ip = f"10.0.{position}.1", f"192.168.0.{position}"
+        payload = bytes(rng.getrandbits(8) for _ in range(rng.randint(0, 60)))
+        protocol = "tcp" if position % 2 else "udp"
+        options = b"\x01" * 4 if position % 5 == 0 else b""
+        frame = link_frame(link_type, ipv4_packet(src_ip, dst_ip, payload, protocol, options), vlan)
+        timestamp = 1000 + position * 0.25
+        records.append((timestamp, frame))
+        expected.append((timestamp, ip_to_int(src_ip), ip_to_int(dst_ip), len(frame) + 4, payload))
+    if link_type != RAW_IP:
+        records.insert(3, (1000.3, link_frame(link_type, b"\x60" + b"\x00" * 39, vlan, ethertype=0x86DD)))  # IPv6
+    path = tmp_path / "trace.pcap"
+    write_pcap(path, link_type, records, byte_order, nanoseconds)
+    packets = [(packet.timestamp, packet.src_ip, packet.dst_ip, packet.size, bytes(packet.content))
+               for packet in read_pcap(str(path))]
+    assert [packet[1:] for packet in packets] == [packet[1:] for packet in expected]
+    assert [packet[0] for packet in packets] == pytest.approx([packet[0] for packet in expected])
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / "trace.pcapng"
+    path.write_bytes(b"\x0a\x0d\x0d\x0a" + b"\x00" * 40)
+    with pytest.raises(ValueError):
+        list(read_pcap(str(path)))
+    empty = tmp_path / "empty.pcap"
+    empty.write_bytes(b"")
+    assert list(read_pcap(str(empty))) == []
+
+
+def test_csv_trace(tmp_path):
+    path = tmp_path / "trace.csv"
+    path.write_text("timestamp,src_ip,dst_ip,size,payload\n"
+                    "0.5,10.0.0.1,10.0.0.2,60,6576696c\n\n"
+                    "0.7,10.0.0.3,10.0.0.2,40,\n")
+    packets = list(read_csv_trace(str(path)))
+    assert [(packet.timestamp, packet.src_ip, packet.size) for packet in packets] == \
+        [(0.5, ip_to_int("10.0.0.1"), 60), (0.7, ip_to_int("10.0.0.3"), 40)]
+    assert bytes(packets[0].content) == b"evil" and packets[1].content is None
+
+
+def test_reordering_within_the_window():
+    rng = random.Random(0)
+    timestamps = [position * 0.01 + rng.uniform(0, 0.05) for position in range(1000)]
+    packets = list(in_timestamp_order((TracePacket(timestamp, 0, 0, 0) for timestamp in timestamps), 0.1))
+    assert [packet.timestamp for packet in packets] == sorted(timestamps)
+
+
+def test_late_packets_never_move_the_clock_back():
+    timestamps = [0.0, 1.0, 2.0, 0.5, 3.0]
+    released = [packet.timestamp for packet in in_timestamp_order(TracePacket(t, 0, 0, 0) for t in timestamps)]
+    assert released == sorted(released) and len(released) == 5
+
+
+def test_headless_trace_runs_through_the_dawn_classifier(tmp_path):
+    path = tmp_path / "trace.csv"
+    rows = ["timestamp,src_ip,dst_ip,size"]
+    rows += [f"{position / 1000},10.0.0.{position % 2},10.1.0.1,60" for position in range(2000)]
+    path.write_text("\n".join(rows) + "\n")
+    config = load_config(overrides=[("trace", str(path)), ("trace_classify", True), ("trace_rate_limit", 100)])
+    simulation = run_simulation(config)
+    # Two sources over two seconds, each allowed its 100-packet burst and then 100 packets per second
+    assert simulation.dropped_packets == pytest.approx(2000 - 2 * 300, abs=4)
+    assert simulation.snapshots[-1]["dropped"] == summary_row(simulation)["dropped"] == simulation.dropped_packets
+    assert simulation.snapshots[0]["dropped"] < simulation.dropped_packets  # Counted as the trace goes
+    unclassified = run_simulation(load_config(overrides=[("trace", str(path))]))
+    assert unclassified.dropped_packets == 0
+    assert len(list(replay_trace(str(path)))) == 2000
+
+
+def test_classifier_is_timed_as_a_profiler_phase(tmp_path):
+    path = tmp_path / "trace.csv"
+    path.write_text("timestamp,src_ip,dst_ip,size\n" + "".join(f"{position / 100},10.0.0.1,10.1.0.1,60\n"
+                                                              for position in range(200)))
+    config = load_config(overrides=[("trace", str(path)), ("trace_classify", True), ("profile", True)])
+    phases = run_simulation(config).profiler.report()["phases"]
+    assert phases["classify"]["calls"] == 200
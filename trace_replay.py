@@ -0,0 +1,175 @@
+import heapq
+import mmap
+import os
+import struct
+import time
+
+from ip_lookup import ip_to_int
+
+PCAP_HEADER = 24
+PCAP_RECORD_HEADER = 16
+# Link types whose packets start with an IPv4 header after a fixed-size link header (or none)
+ETHERNET = 1
+RAW_IP = 101
+IPV4 = 228
+LINUX_SLL = 113
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_VLAN = 0x8100
+TCP = 6
+UDP = 17
+
+
+class TracePacket:
+    # One recorded packet. src_ip and content are the fields monitor_traffic and inspect_packet read; timestamp
+    # is in seconds on the trace's clock, size is the length on the wire, and content is a memoryview of the
+    # transport payload (or None when the trace has no payloads).
+    __slots__ = ("timestamp", "src_ip", "dst_ip", "size", "content")
+
+    def __init__(self, timestamp, src_ip, dst_ip, size, content=None):
+        self.timestamp = timestamp
+        self.src_ip = src_ip
+        self.dst_ip = dst_ip
+        self.size = size
+        self.content = content
+
+
+def map_file(path):
+    with open(path, "rb") as trace_file:
+        if os.fstat(trace_file.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(trace_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+def release_map(mapped):
+    try:
+        mapped.close()
+    except BufferError:
+        pass  # Packets still hold views into the file; the mapping goes when they do
+
+
+def read_pcap(path):
+    # Streams the IPv4 packets of a classic pcap file. The file is memory-mapped, so only the pages being read
+    # are in memory, and payloads are memoryviews into the mapping rather than copies.
+    mapped = map_file(path)
+    if mapped is None:
+        return
+    try:
+        magic = mapped[:4]
+        if magic in (b"\xd4\xc3\xb2\xa1", b"\x4d\x3c\xb2\xa1"):
+            byte_order = "<"
+        elif magic in (b"\xa1\xb2\xc3\xd4", b"\xa1\xb2\x3c\x4d"):
+            byte_order = ">"
+        else:
+            raise ValueError(f"{path} is not a pcap file (pcapng is not supported)")
+        fraction = 1e-9 if magic in (b"\x4d\x3c\xb2\xa1", b"\xa1\xb2\x3c\x4d") else 1e-6
+        link_type = struct.unpack_from(byte_order + "I", mapped, 20)[0] & 0xFFFF
+        record_header = struct.Struct(byte_order + "IIII")
+        data = memoryview(mapped)
+        offset = PCAP_HEADER
+        end = len(mapped)
+        while offset + PCAP_RECORD_HEADER <= end:
+            seconds, fractions, captured, original = record_header.unpack_from(mapped, offset)
+            offset += PCAP_RECORD_HEADER
+            packet = parse_frame(data[offset:offset + captured], link_type, seconds + fractions * fraction, original)
+            offset += captured
+            if packet is not None:
+                yield packet
+        data.release()
+    finally:
+        release_map(mapped)
+
+def parse_frame(frame, link_type, timestamp, size):
+    # The IPv4 packet inside a captured frame, or None for anything else
+    if link_type == ETHERNET:
+        if len(frame) < 14:
+            return None
+        start, ethertype = 14, int.from_bytes(frame[12:14], "big")
+        if ethertype == ETHERTYPE_VLAN and len(frame) >= 18:
+            start, ethertype = 18, int.from_bytes(frame[16:18], "big")
+        if ethertype != ETHERTYPE_IPV4:
+            return None
+    elif link_type == LINUX_SLL:
+        if len(frame) < 16 or int.from_bytes(frame[14:16], "big") != ETHERTYPE_IPV4:
+            return None
+        start = 16
+    elif link_type in (RAW_IP, IPV4):
+        start = 0
+    else:
+        raise ValueError(f"Unsupported pcap link type: {link_type}")
+
+    if len(frame) < start + 20 or frame[start] >> 4 != 4:
+        return None
+    header_length = (frame[start] & 0x0F) * 4
+    protocol = frame[start + 9]
+    src_ip = int.from_bytes(frame[start + 12:start + 16], "big")
+    dst_ip = int.from_bytes(frame[start + 16:start + 20], "big")
+    payload_start = start + header_length
+    if protocol == TCP and len(frame) >= payload_start + 13:
+        payload_start += (frame[payload_start + 12] >> 4) * 4
+    elif protocol == UDP:
+        payload_start += 8
+    return TracePacket(timestamp, src_ip, dst_ip, size, frame[payload_start:])
+
+
+def read_csv_trace(path):
+    # Streams a CSV trace with a header row naming timestamp, src_ip, dst_ip and size columns, plus an optional
+    # hex-encoded payload column. Lines are read from a memory-mapped file, one at a time.
+    mapped = map_file(path)
+    if mapped is None:
+        return
+    try:
+        columns = mapped.readline().decode().strip().split(",")
+        positions = {name: columns.index(name) for name in ("timestamp", "src_ip", "dst_ip", "size")}
+        payload_position = columns.index("payload") if "payload" in columns else None
+        for line in iter(mapped.readline, b""):
+            fields = line.decode().strip().split(",")
+            if fields == [""]:
+                continue
+            content = None
+            if payload_position is not None and fields[payload_position]:
+                content = memoryview(bytes.fromhex(fields[payload_position]))
+            yield TracePacket(float(fields[positions["timestamp"]]), ip_to_int(fields[positions["src_ip"]]),
+                              ip_to_int(fields[positions["dst_ip"]]), int(fields[positions["size"]]), content)
+    finally:
+        release_map(mapped)
+
+
+def open_trace(path):
+    if path.endswith(".csv"):
+        return read_csv_trace(path)
+    return read_pcap(path)
+
+def in_timestamp_order(packets, reorder_window=0.1):
+    # Captures are only roughly ordered. Packets are held for reorder_window seconds of trace time and released
+    # in timestamp order; one that arrives later than that is moved up to the last released timestamp, so the
+    # simulation clock never has to go back.
+    pending = []
+    released = float("-inf")
+    for sequence, packet in enumerate(packets):
+        heapq.heappush(pending, (packet.timestamp, sequence, packet))
+        while pending and pending[0][0] <= packet.timestamp - reorder_window:
+            released = max(released, pending[0][0])
+            yield clamp_timestamp(heapq.heappop(pending)[2], released)
+    while pending:
+        released = max(released, pending[0][0])
+        yield clamp_timestamp(heapq.heappop(pending)[2], released)
+
+def clamp_timestamp(packet, released):
+    packet.timestamp = max(packet.timestamp, released)
+    return packet
+
+def paced(packets, speed=None):
+    # speed=None replays as fast as possible; otherwise trace time runs `speed` times faster than wall time
+    if not speed:
+        yield from packets
+        return
+    started = None
+    for packet in packets:
+        if started is None:
+            started, first_timestamp = time.perf_counter(), packet.timestamp
+        delay = (packet.timestamp - first_timestamp) / speed - (time.perf_counter() - started)
+        if delay > 0:
+            time.sleep(delay)
+        yield packet
+
+def replay_trace(path, speed=None, reorder_window=0.1):
+    return paced(in_timestamp_order(open_trace(path), reorder_window), speed)